@@ -2,15 +2,150 @@
 
 The ``/crawl`` route accepts crawler configuration fields and returns the
 results produced by :func:`run_crawl` as JSON.
+
+Identical requests to ``/crawl`` and ``/crawl-summary`` share one crawl (see
+:class:`CrawlCoalescer`), so a burst of clients asking for the same site
+doesn't start a crawler per client.
 """
 
-from typing import Any, Dict, List, Optional
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import asdict
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
 
 from fastapi import FastAPI, HTTPException
 
 from pydantic import BaseModel, HttpUrl
 
-from wheres_my_value import CrawlerConfig, run_crawl, WebCrawler
+from wheres_my_value import (
+    CrawlerConfig,
+    build_searches,
+    found_value_for,
+    run_crawl,
+    run_crawl_chunk,
+    search_keys,
+    UrlRules,
+    WebCrawler,
+)
+
+# Completed crawls are reused for this many seconds
+RESULT_CACHE_TTL = 30.0
+# Completed crawls kept at most
+RESULT_CACHE_SIZE = 32
+# Matches (and found values) kept across all cached results; a single result
+# larger than this is not cached
+RESULT_CACHE_MAX_ITEMS = 20000
+
+# Config fields that don't change what a crawl finds
+IGNORED_FIELDS = ("search_values", "verbose", "export_results")
+
+
+def result_size(result: Any) -> int:
+    """Approximate size of a crawl result, counted in matches"""
+    if isinstance(result, dict):
+        return 1 + sum(len(items) for items in result.values() if isinstance(items, list))
+    return 1 + len(getattr(result, "found_values", ()))
+
+
+def config_fingerprint(config: CrawlerConfig) -> str:
+    """Identify crawls that visit the same pages, whatever they search for"""
+    fields = {
+        name: value for name, value in asdict(config).items() if name not in IGNORED_FIELDS
+    }
+    return json.dumps(fields, sort_keys=True, default=str)
+
+
+class CrawlCoalescer:
+    """Share crawls between concurrent requests for the same site.
+
+    Requests are grouped by endpoint and :func:`config_fingerprint`. A
+    request whose search values are all covered by a running crawl in its
+    group waits for that crawl instead of starting its own. Finished results
+    are kept for ``ttl`` seconds for requests that arrive right after, up to
+    ``max_entries`` results holding ``max_items`` matches in total (see
+    :func:`result_size`). Callers get the full result of the shared crawl
+    and narrow it to their own search values.
+    """
+
+    def __init__(
+        self,
+        ttl: float = RESULT_CACHE_TTL,
+        max_entries: int = RESULT_CACHE_SIZE,
+        max_items: int = RESULT_CACHE_MAX_ITEMS,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_items = max_items
+        self._running: Dict[Tuple[str, str], List[Tuple[FrozenSet[str], Future]]] = {}
+        # (group, search values) -> (expiry, size, result), least recently used first
+        self._finished: OrderedDict = OrderedDict()
+        self._cached_items = 0
+        self._lock = threading.Lock()
+
+    def run(self, kind: str, config: CrawlerConfig, crawl: Callable[[CrawlerConfig], Any]) -> Any:
+        group = (kind, config_fingerprint(config))
+        values = frozenset(config.search_values)
+        with self._lock:
+            shared = self._find(group, values)
+            if shared is None:
+                future: Future = Future()
+                self._running.setdefault(group, []).append((values, future))
+        if shared is not None:
+            return shared.result()
+
+        try:
+            result = crawl(config)
+        except BaseException as exc:
+            with self._lock:
+                self._forget(group, values, future)
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            self._forget(group, values, future)
+            self._store(group, values, result)
+        future.set_result(result)
+        return result
+
+    def _find(self, group: Tuple[str, str], values: FrozenSet[str]) -> Optional[Future]:
+        now = time.monotonic()
+        for key, (expires, size, result) in list(self._finished.items()):
+            if expires <= now:
+                del self._finished[key]
+                self._cached_items -= size
+            elif key[0] == group and values <= key[1]:
+                self._finished.move_to_end(key)
+                done: Future = Future()
+                done.set_result(result)
+                return done
+        for running_values, future in self._running.get(group, []):
+            if values <= running_values:
+                return future
+        return None
+
+    def _forget(self, group: Tuple[str, str], values: FrozenSet[str], future: Future) -> None:
+        running = self._running[group]
+        running.remove((values, future))
+        if not running:
+            del self._running[group]
+
+    def _store(self, group: Tuple[str, str], values: FrozenSet[str], result: Any) -> None:
+        size = result_size(result)
+        if size > self.max_items:
+            return
+        previous = self._finished.pop((group, values), None)
+        if previous is not None:
+            self._cached_items -= previous[1]
+        self._finished[(group, values)] = (time.monotonic() + self.ttl, size, result)
+        self._cached_items += size
+        while len(self._finished) > self.max_entries or self._cached_items > self.max_items:
+            _, (_, evicted_size, _) = self._finished.popitem(last=False)
+            self._cached_items -= evicted_size
+
+
+coalescer = CrawlCoalescer()
 
 app = FastAPI()
 
@@ -29,6 +164,30 @@ class CrawlRequest(BaseModel):
     respect_robots: bool = True
     use_history: bool = False
     history_file: Optional[str] = None
+    # Crawl scope: path prefixes, glob: or regex: rules
+    include_rules: List[str] = []
+    exclude_rules: List[str] = []
+    # Also search same-origin scripts and JSON referenced by crawled pages
+    scan_assets: bool = False
+
+
+class ChunkedCrawlRequest(CrawlRequest):
+    """Parameters accepted by the ``/crawl-chunk`` endpoint."""
+
+    # Seconds this call may spend crawling; keep it below the function timeout
+    time_budget: float = 8.0
+    # Token returned by the previous call to continue the same crawl
+    continuation: Optional[str] = None
+
+
+class CrawlChunk(BaseModel):
+    """Partial results of a time-budgeted crawl."""
+
+    results: Dict[str, List[Dict[str, Optional[str]]]]
+    continuation: Optional[str]
+    found_values: List[str]
+    pages_visited: int
+    errors: int
 
 
 class CrawlSummary(BaseModel):
@@ -37,14 +196,44 @@ class CrawlSummary(BaseModel):
     found_values: List[str]
     pages_visited: int
     errors: int
+    pages_deduplicated: int = 0
 
 
 @app.post("/crawl")
 def crawl_endpoint(config: CrawlRequest) -> Dict[str, Any]:
     """Execute the crawler with the provided configuration."""
 
-    crawler_config = CrawlerConfig(**config.model_dump())
-    return run_crawl(crawler_config)
+    crawler_config = CrawlerConfig(**config.model_dump(mode="json"))
+    try:
+        results = coalescer.run("crawl", crawler_config, run_crawl)
+    except ValueError as exc:
+        # Invalid regex: or css: search patterns, or invalid scope rules
+        raise HTTPException(status_code=400, detail=str(exc))
+    # A shared crawl may have searched for more values than this request
+    return {
+        key: results[key]
+        for value in config.search_values
+        for key in search_keys(value)
+        if key in results
+    }
+
+
+@app.post("/crawl-chunk", response_model=CrawlChunk)
+def crawl_chunk(config: ChunkedCrawlRequest) -> CrawlChunk:
+    """Crawl within a time budget and return a token to continue later.
+
+    Keep calling with the returned ``continuation`` until it is ``null``.
+    Each call returns only the matches found during that call.
+    """
+
+    crawler_config = CrawlerConfig(
+        **config.model_dump(mode="json", exclude={"time_budget", "continuation"})
+    )
+    try:
+        chunk = run_crawl_chunk(crawler_config, config.time_budget, config.continuation)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return CrawlChunk(**chunk)
 
 
 @app.post("/crawl-summary", response_model=CrawlSummary)
@@ -64,25 +253,37 @@ def crawl_summary(config: CrawlRequest) -> CrawlSummary:
         respect_robots=True,
         use_history=False,
         history_file=None,
+        include_rules=config.include_rules,
+        exclude_rules=config.exclude_rules,
+        scan_assets=config.scan_assets,
     )
 
-    crawler = WebCrawler(crawler_config)
-    searches: List[tuple[str, str]] = []
-    for val in crawler_config.search_values:
-        searches.extend([
-            ("text", val),
-            ("id", val),
-            ("class", val),
-            ("attr", val),
-        ])
+    try:
+        searches = build_searches(crawler_config.search_values)
+        UrlRules(crawler_config.include_rules)
+        UrlRules(crawler_config.exclude_rules)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
     try:
-        crawler.crawl_and_search(searches)
+        summary = coalescer.run("summary", crawler_config, summarize_crawl)
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
+    wanted = {found_value_for(search_type, value) for search_type, value in searches}
+    return summary.model_copy(
+        update={"found_values": [value for value in summary.found_values if value in wanted]}
+    )
+
+
+def summarize_crawl(crawler_config: CrawlerConfig) -> CrawlSummary:
+    """Run a crawl for ``/crawl-summary``."""
+
+    crawler = WebCrawler(crawler_config, index_results=False)
+    crawler.crawl_and_search(build_searches(crawler_config.search_values))
     return CrawlSummary(
         found_values=sorted(list(crawler.found_values)),
         pages_visited=crawler.stats.pages_visited,
         errors=crawler.stats.error_count,
+        pages_deduplicated=crawler.stats.pages_deduplicated,
     )
@@ -0,0 +1,226 @@
+"""Shared crawl frontier backed by a SQLite file.
+
+Several crawler processes can work on the same crawl by leasing URLs from the
+store. A lease expires after ``lease_seconds`` so URLs held by a crashed
+worker are handed out again. URLs that failed transiently are released with
+a delay before they can be leased again. Discovered links, matches and found values are
+written back to the store, which is the single place results are read from.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Frontier row states
+PENDING = 0
+LEASED = 1
+DONE = 2
+FAILED = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS frontier (
+    url TEXT PRIMARY KEY,
+    depth INTEGER NOT NULL,
+    state INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    -- Lease end for LEASED rows; earliest next lease for released PENDING rows
+    lease_expires REAL
+);
+CREATE INDEX IF NOT EXISTS frontier_state ON frontier (state, depth);
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    search_key TEXT NOT NULL,
+    url TEXT NOT NULL,
+    text TEXT NOT NULL,
+    hidden TEXT
+);
+CREATE TABLE IF NOT EXISTS found_values (
+    value TEXT PRIMARY KEY
+);
+"""
+
+
+class FrontierStore:
+    """URL frontier, dedupe set and result sink shared between processes"""
+
+    def __init__(self, path: str, lease_seconds: float = 120.0):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        # sqlite3 connections can't be shared between threads
+        self._local = threading.local()
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def save_config(self, config: Dict[str, Any]) -> None:
+        self._connect().execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('config', ?)",
+            (json.dumps(config),),
+        )
+
+    def load_config(self) -> Dict[str, Any]:
+        row = self._connect().execute(
+            "SELECT value FROM meta WHERE key = 'config'"
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"No crawl configuration stored in {self.path}")
+        return json.loads(row[0])
+
+    def add_urls(self, urls: Iterable[Tuple[str, int]]) -> int:
+        """Add URLs that have not been seen before. Returns the number added."""
+        conn = self._connect()
+        before = conn.total_changes
+        conn.executemany(
+            "INSERT OR IGNORE INTO frontier (url, depth) VALUES (?, ?)",
+            list(urls),
+        )
+        return conn.total_changes - before
+
+    def lease(self, worker_id: str, limit: int, max_pages: int) -> List[Tuple[str, int]]:
+        """Lease up to ``limit`` URLs without exceeding ``max_pages`` in total"""
+        conn = self._connect()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            claimed = conn.execute(
+                "SELECT COUNT(*) FROM frontier WHERE state = ? OR (state = ? AND lease_expires > ?)",
+                (DONE, LEASED, now),
+            ).fetchone()[0]
+            limit = min(limit, max_pages - claimed)
+            if limit <= 0:
+                conn.execute('COMMIT')
+                return []
+            rows = conn.execute(
+                "SELECT url, depth FROM frontier "
+                "WHERE state IN (?, ?) AND COALESCE(lease_expires, 0) <= ? "
+                "ORDER BY depth, rowid LIMIT ?",
+                (PENDING, LEASED, now, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE frontier SET state = ?, worker = ?, lease_expires = ? WHERE url = ?",
+                [(LEASED, worker_id, now + self.lease_seconds, url) for url, _ in rows],
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return [(url, depth) for url, depth in rows]
+
+    def complete(
+        self,
+        worker_id: str,
+        url: str,
+        matches: Dict[str, List[Dict[str, Optional[str]]]],
+        links: Dict[str, int],
+        found_values: Iterable[str] = (),
+    ) -> bool:
+        """Record a processed page.
+
+        Returns ``False`` if the lease was lost to another worker in the
+        meantime, in which case nothing is written.
+        """
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            updated = conn.execute(
+                "UPDATE frontier SET state = ?, lease_expires = NULL "
+                "WHERE url = ? AND worker = ? AND state = ?",
+                (DONE, url, worker_id, LEASED),
+            ).rowcount
+            if not updated:
+                conn.execute('ROLLBACK')
+                return False
+            conn.executemany(
+                "INSERT INTO matches (search_key, url, text, hidden) VALUES (?, ?, ?, ?)",
+                [
+                    (key, url, item["text"], item.get("hidden"))
+                    for key, items in matches.items() for item in items
+                ],
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO found_values (value) VALUES (?)",
+                [(value,) for value in found_values],
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO frontier (url, depth) VALUES (?, ?)",
+                list(links.items()),
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return True
+
+    def release(self, worker_id: str, url: str, delay: float) -> None:
+        """Hand a leased URL back to be leased again after ``delay`` seconds"""
+        self._connect().execute(
+            "UPDATE frontier SET state = ?, worker = NULL, lease_expires = ? "
+            "WHERE url = ? AND worker = ? AND state = ?",
+            (PENDING, time.time() + delay, url, worker_id, LEASED),
+        )
+
+    def fail(self, worker_id: str, url: str) -> None:
+        """Give up on a leased URL for good"""
+        self._connect().execute(
+            "UPDATE frontier SET state = ?, lease_expires = NULL WHERE url = ? AND worker = ?",
+            (FAILED, url, worker_id),
+        )
+
+    def is_finished(self, max_pages: int) -> bool:
+        """True when nothing is pending or leased, or the page limit is reached"""
+        conn = self._connect()
+        done = conn.execute(
+            "SELECT COUNT(*) FROM frontier WHERE state = ?", (DONE,)
+        ).fetchone()[0]
+        outstanding = conn.execute(
+            "SELECT COUNT(*) FROM frontier WHERE state IN (?, ?)", (PENDING, LEASED)
+        ).fetchone()[0]
+        if done >= max_pages:
+            return not conn.execute(
+                "SELECT 1 FROM frontier WHERE state = ? AND lease_expires > ? LIMIT 1",
+                (LEASED, time.time()),
+            ).fetchone()
+        return outstanding == 0
+
+    def pages_done(self) -> int:
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM frontier WHERE state = ?", (DONE,)
+        ).fetchone()[0]
+
+    def visited_urls(self) -> List[str]:
+        return [row[0] for row in self._connect().execute(
+            "SELECT url FROM frontier WHERE state = ? ORDER BY rowid", (DONE,)
+        )]
+
+    def found_values(self) -> List[str]:
+        return [row[0] for row in self._connect().execute(
+            "SELECT value FROM found_values ORDER BY value"
+        )]
+
+    def results(self, keys: Optional[Iterable[str]] = None) -> Dict[str, List[Dict[str, Optional[str]]]]:
+        """Aggregate matches from every worker in ``run_crawl`` format"""
+        results: Dict[str, List[Dict[str, Optional[str]]]] = {key: [] for key in keys or ()}
+        for key, url, text, hidden in self._connect().execute(
+            "SELECT search_key, url, text, hidden FROM matches ORDER BY id"
+        ):
+            results.setdefault(key, []).append({"url": url, "text": text, "hidden": hidden})
+        return results
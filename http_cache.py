@@ -0,0 +1,261 @@
+"""On-disk HTTP response cache for repeated crawls of the same site.
+
+Bodies are stored once per content digest under ``<directory>/bodies`` and a
+SQLite index maps each URL to its body, response headers and expiry time.
+Freshness follows ``Cache-Control``/``Expires`` (with the usual heuristic for
+responses that only carry ``Last-Modified``). Stale entries with an ``ETag``
+or ``Last-Modified`` can be revalidated with a conditional request. When the
+bodies exceed ``max_bytes``, the least recently used entries are evicted.
+"""
+
+import email.utils
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Mapping, NamedTuple, Optional
+
+# Bodies are stored decoded, so these no longer describe them
+DROPPED_HEADERS = frozenset({'content-encoding', 'content-length', 'transfer-encoding'})
+
+# Heuristic freshness: a fraction of the time since Last-Modified, capped
+HEURISTIC_FRACTION = 0.1
+HEURISTIC_MAX_AGE = 24 * 3600.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bodies (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    url TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    final_url TEXT NOT NULL,
+    headers TEXT NOT NULL,
+    expires REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+CREATE INDEX IF NOT EXISTS entries_digest ON entries (digest);
+"""
+
+_DIRECTIVE = re.compile(r'([\w-]+)\s*(?:=\s*"?([^",]*)"?)?')
+
+
+def normalize_headers(headers: Mapping[str, str]) -> Dict[str, str]:
+    """Lower-case header names; HTTP/2 servers send them that way anyway"""
+    return {name.lower(): value for name, value in headers.items()}
+
+
+def cache_directives(headers: Dict[str, str]) -> Dict[str, Optional[str]]:
+    """Parse ``cache-control`` into a dict of lower-cased directives"""
+    value = headers.get('cache-control', '')
+    return {name.lower(): arg for name, arg in _DIRECTIVE.findall(value)}
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def freshness_lifetime(headers: Dict[str, str], now: float) -> float:
+    """Seconds a response stays fresh after it was received (0 if stale).
+
+    ``headers`` must have lower-case names (see :func:`normalize_headers`).
+    """
+    directives = cache_directives(headers)
+    if 'no-cache' in directives:
+        return 0.0
+    try:
+        age = float(headers.get('age', 0))
+    except ValueError:
+        age = 0.0
+
+    max_age = directives.get('max-age')
+    if max_age is not None:
+        try:
+            return max(float(max_age) - age, 0.0)
+        except ValueError:
+            return 0.0
+
+    date = _http_date(headers.get('date')) or now
+    expires = headers.get('expires')
+    if expires is not None:
+        # An invalid Expires value means "already expired"
+        expires_at = _http_date(expires)
+        return max(expires_at - date - age, 0.0) if expires_at else 0.0
+
+    last_modified = _http_date(headers.get('last-modified'))
+    if last_modified is not None and last_modified < date:
+        return min((date - last_modified) * HEURISTIC_FRACTION, HEURISTIC_MAX_AGE)
+    return 0.0
+
+
+def is_storable(headers: Dict[str, str]) -> bool:
+    return 'no-store' not in cache_directives(headers)
+
+
+class CachedResponse(NamedTuple):
+    """A cached response and whether it can be used without revalidation"""
+    url: str
+    # Lower-case header names
+    headers: Dict[str, str]
+    body: bytes
+    fresh: bool
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers for revalidating this response"""
+        conditional = {}
+        if 'etag' in self.headers:
+            conditional['If-None-Match'] = self.headers['etag']
+        if 'last-modified' in self.headers:
+            conditional['If-Modified-Since'] = self.headers['last-modified']
+        return conditional
+
+
+class HttpCache:
+    """Content-addressed response bodies with an LRU index keyed by URL"""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._bodies = os.path.join(directory, 'bodies')
+        os.makedirs(self._bodies, exist_ok=True)
+        # sqlite3 connections can't be shared between threads
+        self._local = threading.local()
+        self._evict_lock = threading.Lock()
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(
+                os.path.join(self.directory, 'index.sqlite'), timeout=30.0, isolation_level=None
+            )
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _body_path(self, digest: str) -> str:
+        return os.path.join(self._bodies, digest[:2], digest)
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        """Return the cached response for ``url``, fresh or not"""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT digest, final_url, headers, expires FROM entries WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        digest, final_url, headers, expires = row
+        try:
+            with open(self._body_path(digest), 'rb') as f:
+                body = f.read()
+        except OSError:
+            # Body file removed behind our back; forget the entry
+            conn.execute("DELETE FROM entries WHERE url = ?", (url,))
+            return None
+        now = time.time()
+        conn.execute("UPDATE entries SET last_used = ? WHERE url = ?", (now, url))
+        return CachedResponse(final_url, json.loads(headers), body, expires > now)
+
+    def put(self, url: str, final_url: str, headers: Mapping[str, str], body: bytes) -> bool:
+        """Store a 200 response. Returns ``False`` if it must not be cached."""
+        headers = {
+            name: value for name, value in normalize_headers(headers).items()
+            if name not in DROPPED_HEADERS
+        }
+        if not is_storable(headers) or len(body) > self.max_bytes:
+            return False
+        now = time.time()
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        path = self._body_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(body)
+            os.replace(temp_path, path)
+
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            previous = conn.execute(
+                "SELECT digest FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+            conn.execute(
+                "INSERT OR IGNORE INTO bodies (digest, size) VALUES (?, ?)", (digest, len(body))
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (url, digest, final_url, headers, expires, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, digest, final_url, json.dumps(headers), now + freshness_lifetime(headers, now), now),
+            )
+            if previous and previous[0] != digest:
+                self._drop_unused_body(conn, previous[0])
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        self._evict()
+        return True
+
+    def refresh(self, url: str, headers: Mapping[str, str]) -> None:
+        """Update a revalidated entry with the headers of a 304 response"""
+        conn = self._connect()
+        row = conn.execute("SELECT headers FROM entries WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return
+        merged = json.loads(row[0])
+        merged.update(normalize_headers(headers))
+        now = time.time()
+        conn.execute(
+            "UPDATE entries SET headers = ?, expires = ?, last_used = ? WHERE url = ?",
+            (json.dumps(merged), now + freshness_lifetime(merged, now), now, url),
+        )
+
+    def size(self) -> int:
+        return self._connect().execute("SELECT COALESCE(SUM(size), 0) FROM bodies").fetchone()[0]
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the bodies fit in ``max_bytes``"""
+        conn = self._connect()
+        with self._evict_lock:
+            excess = self.size() - self.max_bytes
+            while excess > 0:
+                oldest = conn.execute(
+                    "SELECT url, digest FROM entries ORDER BY last_used LIMIT 64"
+                ).fetchall()
+                if not oldest:
+                    break
+                for url, digest in oldest:
+                    conn.execute("DELETE FROM entries WHERE url = ?", (url,))
+                    excess -= self._drop_unused_body(conn, digest)
+                    if excess <= 0:
+                        break
+
+    def _drop_unused_body(self, conn: sqlite3.Connection, digest: str) -> int:
+        """Delete a body no entry refers to any more. Returns the bytes freed."""
+        if conn.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)).fetchone():
+            return 0
+        row = conn.execute("SELECT size FROM bodies WHERE digest = ?", (digest,)).fetchone()
+        conn.execute("DELETE FROM bodies WHERE digest = ?", (digest,))
+        try:
+            os.remove(self._body_path(digest))
+        except OSError:
+            pass
+        return row[0] if row else 0
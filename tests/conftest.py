@@ -0,0 +1,61 @@
+import io
+import time
+from typing import Any, BinaryIO, Callable, Dict, List, Mapping, Union
+
+import pytest
+import requests
+from requests.utils import get_encoding_from_headers
+
+
+def make_response(
+    url: str,
+    body: Union[str, bytes, BinaryIO] = b"",
+    headers: Mapping[str, str] = None,
+    status: int = 200,
+) -> requests.Response:
+    """A streamed ``requests.Response`` like the transport adapter builds.
+
+    ``body`` may also be a file-like raw stream, e.g. a urllib3 response.
+    """
+    if isinstance(body, str):
+        body = body.encode()
+    response = requests.Response()
+    response.status_code = status
+    response.url = url
+    response.headers.update(headers or {})
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.raw = body if hasattr(body, "read") else io.BytesIO(body)
+    return response
+
+
+@pytest.fixture
+def fake_site(monkeypatch):
+    """Serve canned responses from ``requests.get`` and ``Session.get``.
+
+    Call the fixture with a mapping of URL to a body, ``(body, headers)`` or
+    ``(body, headers, status)``, or with a ``handler(url, kwargs)`` returning
+    the same (or a prepared response, or raising). URLs missing from a
+    mapping are a 404. Returns the list of requested URLs.
+    """
+    def serve(
+        pages: Union[Mapping[str, Any], Callable[[str, Dict[str, Any]], Any]],
+        delay: float = 0.0,
+    ) -> List[str]:
+        requested: List[str] = []
+
+        def get(url, **kwargs):
+            requested.append(url)
+            if delay:
+                time.sleep(delay)
+            spec = pages(url, kwargs) if callable(pages) else pages.get(url, ("", {}, 404))
+            if isinstance(spec, requests.Response):
+                return spec
+            if not isinstance(spec, tuple):
+                spec = (spec,)
+            return make_response(url, *spec)
+
+        monkeypatch.setattr(requests, "get", get)
+        monkeypatch.setattr(requests.Session, "get", lambda self, url, **kwargs: get(url, **kwargs))
+        return requested
+
+    return serve
@@ -1,4 +1,6 @@
 import sys
+import threading
+import time
 from pathlib import Path
 from fastapi.testclient import TestClient
 
@@ -23,3 +25,115 @@ def test_crawl_endpoint(monkeypatch):
     assert response.json() == {
         "text:match": [{"url": "https://example.com/", "text": "match"}]
     }
+
+
+def test_crawl_chunk_endpoint(monkeypatch):
+    calls = []
+
+    def fake_run_crawl_chunk(config, time_budget, continuation):
+        calls.append((time_budget, continuation))
+        return {
+            "results": {"text:match": []},
+            "continuation": None if continuation else "next",
+            "found_values": [],
+            "pages_visited": 1,
+            "errors": 0,
+        }
+
+    monkeypatch.setattr(server, "run_crawl_chunk", fake_run_crawl_chunk)
+    client = TestClient(server.app)
+    payload = {"base_url": "https://example.com", "search_values": ["match"], "time_budget": 3}
+    first = client.post("/crawl-chunk", json=payload).json()
+    assert first["continuation"] == "next"
+    second = client.post("/crawl-chunk", json={**payload, "continuation": "next"}).json()
+    assert second["continuation"] is None
+    assert calls == [(3.0, None), (3.0, "next")]
+
+
+def test_identical_crawls_are_coalesced(monkeypatch):
+    calls = []
+    release = threading.Event()
+
+    def fake_run_crawl(config):
+        calls.append(sorted(config.search_values))
+        release.wait(5)
+        return {
+            f"text:{value}": [{"url": config.base_url, "text": value}]
+            for value in config.search_values
+        }
+
+    monkeypatch.setattr(server, "run_crawl", fake_run_crawl)
+    monkeypatch.setattr(server, "coalescer", server.CrawlCoalescer(ttl=60))
+    client = TestClient(server.app)
+    payload = {"base_url": "https://example.com", "search_values": ["a", "b"]}
+
+    responses = {}
+
+    def post(name, values):
+        responses[name] = client.post("/crawl", json={**payload, "search_values": values}).json()
+
+    threads = [
+        threading.Thread(target=post, args=("both", ["a", "b"])),
+        threading.Thread(target=post, args=("same", ["b", "a"])),
+        threading.Thread(target=post, args=("subset", ["b"])),
+    ]
+    threads[0].start()
+    while not calls:
+        time.sleep(0.01)
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [["a", "b"]]
+    assert responses["same"] == responses["both"]
+    assert responses["subset"] == {"text:b": [{"url": "https://example.com/", "text": "b"}]}
+
+    # Finished crawls are reused, but a different configuration crawls again
+    client.post("/crawl", json={**payload, "search_values": ["a"]})
+    assert len(calls) == 1
+    client.post("/crawl", json={**payload, "max_pages": 5})
+    assert len(calls) == 2
+
+
+def test_coalescer_cache_is_bounded_by_result_size():
+    coalescer = server.CrawlCoalescer(ttl=60, max_items=25)
+    calls = []
+
+    def crawl(matches):
+        def run(config):
+            calls.append(config.base_url)
+            return {"text:a": [{"url": config.base_url, "text": "a"}] * matches}
+        return run
+
+    def config(base_url):
+        return server.CrawlerConfig(
+            base_url=base_url, search_values=["a"], sleep_time=0, timeout=1, max_pages=1,
+            max_depth=1, max_workers=1, verbose=False, export_results=False,
+            respect_robots=False, use_history=False, history_file=None,
+        )
+
+    # Too large to cache at all
+    coalescer.run("crawl", config("https://big.example"), crawl(30))
+    coalescer.run("crawl", config("https://big.example"), crawl(30))
+    assert calls == ["https://big.example"] * 2
+
+    # Two 10-match results fit; a third evicts the least recently used one
+    for site in ("one", "two", "one", "three"):
+        coalescer.run("crawl", config(f"https://{site}.example"), crawl(10))
+    assert calls[2:] == ["https://one.example", "https://two.example", "https://three.example"]
+    coalescer.run("crawl", config("https://two.example"), crawl(10))
+    assert calls[-1] == "https://two.example"
+    assert coalescer._cached_items <= 25
+
+
+def test_invalid_url_rules_are_rejected():
+    client = TestClient(server.app)
+    payload = {"base_url": "https://example.com", "search_values": ["a"]}
+    for endpoint in ("/crawl", "/crawl-summary"):
+        response = client.post(endpoint, json={**payload, "exclude_rules": [r"regex:/(a)\2"]})
+        assert response.status_code == 400
+        response = client.post(endpoint, json={**payload, "include_rules": ["docs/"]})
+        assert response.status_code == 400
@@ -1,4 +1,11 @@
+import base64
+import io
+import os
 import sys
+import threading
+import time
+import zlib
+from queue import Empty
 from pathlib import Path
 
 import pytest
@@ -9,7 +16,28 @@ from requests.exceptions import RequestException
 # Allow import from repository root
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-from wheres_my_value import WebCrawler, CrawlerConfig
+from wheres_my_value import (
+    MAX_TOKEN_BYTES,
+    AssetMatcher,
+    BatchCrawler,
+    WebCrawler,
+    CrawlerConfig,
+    MatchRecord,
+    ResultIndex,
+    RobotsRules,
+    SpillingQueue,
+    UrlRules,
+    TTLCache,
+    build_searches,
+    build_visibility_index,
+    export_results_to_file,
+    extract_links,
+    search_html,
+    serialize_results,
+    get_inherited_hidden_reason,
+    lookup_hidden_reason,
+    _token_mac,
+)
 
 
 def make_config(**overrides) -> CrawlerConfig:
@@ -32,30 +60,20 @@ def make_config(**overrides) -> CrawlerConfig:
 
 
 @pytest.fixture
-def mock_request_success(monkeypatch):
+def mock_request_success(fake_site):
     def _mock(url: str, text: str = "ok", status: int = 200):
-        response = requests.Response()
-        response.status_code = status
-        response._content = text.encode()
-        response.url = url
-        response.raise_for_status = lambda: None
-
-        def fake_get(*args, **kwargs):
-            return response
-
-        monkeypatch.setattr(requests, "get", fake_get)
-        return response
+        fake_site({url: (text, {}, status)})
 
     return _mock
 
 
 @pytest.fixture
-def mock_request_failure(monkeypatch):
+def mock_request_failure(fake_site):
     def _mock():
-        def fake_get(*args, **kwargs):
+        def serve(url, kwargs):
             raise RequestException("boom")
 
-        monkeypatch.setattr(requests, "get", fake_get)
+        fake_site(serve)
 
     return _mock
 
@@ -113,3 +131,688 @@ def test_make_request_failure(mock_request_failure):
     resp = crawler.make_request(url)
     assert resp is None
     assert crawler.stats.error_count == 1
+
+
+def test_batch_crawl_shares_pool(fake_site):
+    fake_site({
+        "https://one.example/": '<a href="/about">about</a> match',
+        "https://one.example/about": "nothing here",
+        "https://two.example/": "another match",
+    })
+    configs = [
+        make_config(base_url="https://one.example/", search_values=["match"]),
+        make_config(base_url="https://two.example/", search_values=["match"]),
+    ]
+    batch = BatchCrawler(configs, max_workers=2)
+    results = batch.crawl_and_search(build_searches(["match"]))
+
+    assert set(results) == {"https://one.example/", "https://two.example/"}
+    assert [record.url for record in results["https://one.example/"]["text:match"]] == [
+        "https://one.example/"
+    ]
+    assert len(results["https://two.example/"]["text:match"]) == 1
+    assert batch.crawlers[0].visited_urls == {
+        "https://one.example/",
+        "https://one.example/about",
+    }
+
+
+def test_batch_crawl_stops_at_max_pages(fake_site):
+    links = "".join(f'<a href="/p{i}">x</a>' for i in range(50))
+    fake_site(lambda url, kwargs: f"<p>match</p>{links}", delay=0.02)
+    batch = BatchCrawler(
+        [make_config(base_url="https://one.example/", max_pages=5, dedupe_content=False)],
+        max_workers=16,
+    )
+    thread = threading.Thread(target=batch.crawl_and_search, args=(build_searches(["match"]),))
+    thread.start()
+    thread.join(10)
+    assert not thread.is_alive()
+    crawler = batch.crawlers[0]
+    assert crawler.stats.pages_visited == 5
+    # Pages finishing after the stop don't refill the queue
+    assert crawler.url_queue.qsize() == 0
+
+
+def test_duplicate_pages_reuse_results(fake_site):
+    article = " ".join(f"word{i}" for i in range(60))
+    pages = {
+        "https://example.com/a": f"<p>{article} match</p>",
+        "https://example.com/a?session=1": f"<p>{article} match</p>",
+        "https://example.com/print/a": f"<div><p>{article} match</p></div>",
+    }
+    fake_site(pages)
+    crawler = WebCrawler(make_config(search_values=["match"], near_duplicate_distance=3))
+    searches = build_searches(["match"])
+    results = {}
+    for url in pages:
+        assert crawler.process_url(url, 0, searches, results)
+
+    assert [record.url for record in results["text:match"]] == ["https://example.com/a"]
+    assert crawler.stats.pages_deduplicated == 2
+    assert [match.url for match in crawler.result_index.matches("match")] == ["https://example.com/a"]
+    assert crawler.duplicate_pages == {
+        "https://example.com/a?session=1": "https://example.com/a",
+        "https://example.com/print/a": "https://example.com/a",
+    }
+
+
+def test_near_duplicates_with_new_matches_are_searched(fake_site):
+    article = " ".join(f"word{i}" for i in range(200))
+    pages = {
+        "https://example.com/a": f"<p>{article}</p>",
+        "https://example.com/form": f'<p>{article}</p><form id="spam-form"></form>',
+        "https://example.com/token": f"<p>{article} leaked-token</p>",
+    }
+    fake_site(pages)
+    values = ["spam-form", "leaked-token"]
+    searches = build_searches(values)
+    for config in (make_config(search_values=values), make_config(search_values=values, near_duplicate_distance=3)):
+        crawler = WebCrawler(config)
+        results = {}
+        for url in pages:
+            crawler.process_url(url, 0, searches, results)
+        assert [record.url for record in results["id:spam-form"]] == ["https://example.com/form"]
+        assert [record.url for record in results["text:leaked-token"]] == ["https://example.com/token"]
+        assert crawler.stats.pages_deduplicated == 0
+
+
+def test_make_request_aborts_non_html_and_oversized(fake_site):
+    pages = {
+        "https://example.com/page": (
+            b"<p>hello</p>",
+            {"Content-Type": "text/html; charset=utf-8", "Content-Length": "12"},
+        ),
+        "https://example.com/download": (
+            b"%PDF" * 1000,
+            {"Content-Type": "application/pdf", "Content-Length": "4000"},
+        ),
+        # Pretend the server didn't announce the size
+        "https://example.com/huge": (b"x" * 5000, {"Content-Type": "text/html"}),
+    }
+
+    def serve(url, kwargs):
+        assert kwargs["stream"] is True
+        return pages[url]
+
+    fake_site(serve)
+    crawler = WebCrawler(make_config(max_body_bytes=1024))
+
+    resp = crawler.make_request("https://example.com/page")
+    assert resp is not None and resp.text == "<p>hello</p>"
+    assert crawler.make_request("https://example.com/download") is None
+    assert crawler.make_request("https://example.com/huge") is None
+    assert crawler.stats.responses_aborted == 2
+    assert crawler.stats.bytes_saved == 4000
+    assert crawler.stats.error_count == 0
+    assert "https://example.com/download" in crawler.visited_urls
+
+
+def test_visibility_index_inherits_from_ancestors():
+    html = """
+    <div style="display : none"><section><p>spam <b>link</b></p></section></div>
+    <div style="visibility: hidden"><span style="visibility: visible">shown</span><i>gone</i></div>
+    <p class="sr-only">screen reader</p>
+    <p>plain</p>
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    index = build_visibility_index(soup)
+
+    spam = soup.find(string="link")
+    assert lookup_hidden_reason(spam, index) == "Inside hidden <div>: CSS display:none"
+    assert lookup_hidden_reason(spam, index) == get_inherited_hidden_reason(spam)
+    assert lookup_hidden_reason(soup.find(string="shown"), index) is None
+    assert lookup_hidden_reason(soup.find(string="gone"), index) == (
+        "Inside hidden <div>: CSS visibility:hidden"
+    )
+    assert lookup_hidden_reason(soup.find(string="screen reader"), index) == "Hidden class"
+    assert lookup_hidden_reason(soup.find(string="plain"), index) is None
+
+
+def test_time_budget_continuation(fake_site, monkeypatch):
+    pages = {
+        "https://example.com": '<a href="/a">a</a><a href="/b">b</a> match',
+        "https://example.com/a": "match on a",
+        "https://example.com/b": "match on b",
+    }
+    fetched = fake_site(pages)
+    config = make_config(search_values=["match"], sleep_time=0.0)
+    searches = build_searches(["match"])
+
+    first = WebCrawler(config)
+    with monkeypatch.context() as patch:
+        # Pretend pages are slow so only the start page fits in the budget
+        patch.setattr(WebCrawler, "_budget_allows_page", lambda self: self.stats.pages_visited < 1)
+        first.crawl_and_search(searches, deadline=time.monotonic() + 5)
+    assert first.budget_exhausted
+    token = first.continuation_token()
+    assert token is not None
+
+    second = WebCrawler(config)
+    second.resume_from(token)
+    results = second.crawl_and_search(searches, deadline=time.monotonic() + 5)
+    assert not second.budget_exhausted
+    assert second.continuation_token() is None
+    assert second.stats.pages_visited == 3
+    assert sorted(record.url for record in results["text:match"]) == [
+        "https://example.com/a",
+        "https://example.com/b",
+    ]
+    assert fetched.count("https://example.com") == 2  # connection test + crawl
+
+    with pytest.raises(ValueError):
+        WebCrawler(make_config(search_values=["other"])).resume_from(token)
+
+    # Tokens must carry this server's signature and inflate to a bounded size
+    raw = base64.urlsafe_b64decode(token)
+    forged = base64.urlsafe_b64encode(raw[:-1] + bytes([raw[-1] ^ 1])).decode()
+    with pytest.raises(ValueError, match="signature"):
+        WebCrawler(config).resume_from(forged)
+    bomb = zlib.compress(b" " * (MAX_TOKEN_BYTES + 1))
+    with pytest.raises(ValueError, match="larger than"):
+        WebCrawler(config).resume_from(base64.urlsafe_b64encode(_token_mac(bomb) + bomb).decode())
+
+
+def test_robots_rules_memoize_by_prefix():
+    from urllib.robotparser import RobotFileParser
+
+    parser = RobotFileParser()
+    parser.parse(["User-agent: *", "Disallow: /private", "Allow: /"])
+    rules = RobotsRules(parser)
+    agent = "test-agent"
+    urls = [
+        "https://example.com/",
+        "https://example.com/private",
+        "https://example.com/private/a?b=1",
+        "https://example.com/privacy",
+        "https://example.com/public/page",
+    ]
+    for url in urls:
+        assert rules.can_fetch(agent, url) == parser.can_fetch(agent, url)
+    # Both /private URLs share one memo entry
+    assert len(rules._memo) == 4
+
+
+def test_ttl_cache_serves_stale_while_refreshing():
+    cache = TTLCache(max_entries=2, ttl=0.0)
+    loads = []
+
+    def loader(key):
+        loads.append(key)
+        return len(loads)
+
+    assert cache.get("a", loader) == 1
+    # Expired: the old value is returned immediately and reloaded in background
+    assert cache.get("a", loader) == 1
+    for _ in range(100):
+        if len(loads) == 2:
+            break
+        time.sleep(0.01)
+    assert loads == ["a", "a"]
+
+    cache.get("b", loader)
+    cache.get("c", loader)
+    assert "a" not in cache._entries
+
+
+def test_extract_links_from_raw_bytes():
+    html = b"""
+    <html><head><base href="https://example.com/docs/"></head><body>
+    <!-- <a href="/commented-out">no</a> -->
+    <script>var s = '<a href="/in-script">no</a>';</script>
+    <A HREF='guide.html#intro'>guide</A>
+    <a class="x" href=/top?a=1&amp;b=2>top</a>
+    <a name="anchor-only">none</a>
+    </body></html>
+    """
+    assert list(extract_links(html, "https://example.com/page")) == [
+        "https://example.com/docs/guide.html",
+        "https://example.com/top?a=1&b=2",
+    ]
+
+
+def test_links_use_the_page_encoding(fake_site):
+    fake_site({
+        "https://example.com/": (
+            '<a href="/café">café</a>'.encode("latin-1"),
+            {"Content-Type": "text/html; charset=iso-8859-1"},
+        ),
+    })
+    crawler = WebCrawler(make_config())
+    page = crawler.crawl_page("https://example.com/", 0, [])
+    assert list(page.links) == ["https://example.com/café"]
+
+
+def test_get_links_has_no_default_cap():
+    crawler = WebCrawler(make_config())
+    html = "".join(f'<a href="/p{i}">{i}</a>' for i in range(120))
+    assert len(crawler.get_links(html.encode(), "https://example.com", 0)) == 120
+
+    capped = WebCrawler(make_config(max_links_per_page=10))
+    assert len(capped.get_links(html.encode(), "https://example.com", 0)) == 10
+
+
+def test_include_and_exclude_rules_prune_links():
+    crawler = WebCrawler(make_config(
+        include_rules=["/docs/", "glob:/blog/*/2024-*"],
+        exclude_rules=["/docs/archive/", r"regex:[?&]sort="],
+    ))
+    paths = [
+        "/docs/intro", "/docs/archive/old", "/docs/list?page=2&sort=asc",
+        "/blog/news/2024-05-01", "/blog/news/2023-01-01", "/about",
+    ]
+    html = "".join(f'<a href="{path}">x</a>' for path in paths)
+    links = crawler.get_links(html.encode(), "https://example.com", 0)
+    assert set(links) == {"https://example.com/docs/intro", "https://example.com/blog/news/2024-05-01"}
+    # Links repeated on other pages are only counted once
+    crawler.get_links(html.encode(), "https://example.com/docs/intro", 1)
+    assert crawler.stats.pruned_by_rule == {
+        "exclude /docs/archive/": 1,
+        r"exclude regex:[?&]sort=": 1,
+        "not included": 2,
+    }
+
+    with pytest.raises(ValueError):
+        UrlRules(["docs/"])
+    with pytest.raises(ValueError):
+        UrlRules(["regex:("])
+
+
+def test_url_rules_keep_regexes_that_cannot_be_combined():
+    rules = UrlRules([
+        "regex:(?i)/calendar",
+        r"regex:/(a)\1",
+        r"regex:/x(y)\1",
+        "regex:/(?P<r0>named)",
+        "regex:[?&]sort=",
+        "glob:/tag/*",
+    ])
+    assert rules.match("/CALENDAR/2024") == "regex:(?i)/calendar"
+    assert rules.match("/aa") == r"regex:/(a)\1"
+    assert rules.match("/page/xyy") == r"regex:/x(y)\1"
+    assert rules.match("/named") == "regex:/(?P<r0>named)"
+    assert rules.match("/list?page=2&sort=asc") == "regex:[?&]sort="
+    assert rules.match("/tag/python") == "glob:/tag/*"
+    assert rules.match("/about") is None
+
+    # Invalid rules are a ValueError, which the API reports as a 400
+    with pytest.raises(ValueError):
+        UrlRules(["regex:/(a)\\2"])
+
+
+def test_regex_and_css_searches():
+    searches = build_searches(["contact", r"regex:sk_live_[0-9a-z]{8}", "css:form input[name=email]"])
+    assert searches[-2:] == [("regex", r"sk_live_[0-9a-z]{8}"), ("css", "form input[name=email]")]
+    assert len(searches) == 6
+
+    html = """
+    <div data-key="sk_live_abcd1234">config</div>
+    <script>var key = "sk_live_zzzz9999";</script>
+    <form><input name="email"><input name="phone"></form>
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    regex_matches = search_html(soup, "regex", r"sk_live_[0-9a-z]{8}")
+    assert [getattr(m, "name", None) or str(m).strip() for m in regex_matches] == [
+        'var key = "sk_live_zzzz9999";',
+        "div",
+    ]
+    css_matches = search_html(soup, "css", "form input[name=email]")
+    assert [m["name"] for m in css_matches] == ["email"]
+
+    with pytest.raises(ValueError):
+        build_searches(["regex:("])
+
+
+def test_concurrent_claims_queue_each_url_once():
+    crawler = WebCrawler(make_config())
+    urls = [f"https://example.com/p{i}" for i in range(200)]
+    threads_count = 16
+    barrier = threading.Barrier(threads_count)
+    claimed = []
+
+    def claim_all(offset):
+        barrier.wait()
+        # Every thread claims every URL, starting at a different point
+        won = [crawler.claim_url(url, 1) for url in urls[offset:] + urls[:offset]]
+        claimed.append(sum(won))
+
+    threads = [threading.Thread(target=claim_all, args=(i * 13,)) for i in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(claimed) == len(urls)
+    assert sorted(url for url, _ in crawler.url_queue.snapshot()) == sorted(urls)
+    assert len(crawler._claimed) == len(urls)
+    assert not crawler.claim_url(urls[0], 1)
+
+
+@pytest.mark.skipif(
+    not os.environ.get("RUN_BENCHMARKS"),
+    reason="wall-clock benchmark; set RUN_BENCHMARKS=1 to run",
+)
+def test_worker_throughput_scales_past_32_workers(fake_site):
+    def serve(url, kwargs):
+        page = int(url.rsplit("/p", 1)[-1]) if "/p" in url else 0
+        links = "".join(f'<a href="/p{page * 10 + i}">x</a>' for i in range(1, 11))
+        return f"<p>page {page} match</p>{links}"
+
+    fake_site(serve, delay=0.1)
+    searches = build_searches(["match"])
+
+    def pages_per_second(workers: int) -> float:
+        max_pages = workers * 4
+        crawler = WebCrawler(make_config(
+            search_values=["match"], max_pages=max_pages, max_depth=10, max_workers=workers,
+        ))
+        crawler.claim_url(crawler.config.base_url, 0)
+        results = {}
+        threads = [
+            threading.Thread(target=crawler.worker, args=(searches, results))
+            for _ in range(workers)
+        ]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+        assert crawler.stats.pages_visited == max_pages
+        assert len(results["text:match"]) == max_pages
+        return max_pages / elapsed
+
+    rate_32 = pages_per_second(32)
+    rate_64 = pages_per_second(64)
+    assert rate_64 > rate_32 * 1.4
+
+
+def test_transient_errors_are_retried(fake_site):
+    pages = {
+        "https://example.com": '<a href="/flaky">f</a><a href="/missing">m</a>',
+        "https://example.com/flaky": "match",
+    }
+
+    def serve(url, kwargs):
+        if url == "https://example.com/flaky" and attempts.count(url) == 1:
+            raise requests.ConnectionError("reset")
+        return pages.get(url, ("", {}, 404))
+
+    attempts = fake_site(serve)
+    crawler = WebCrawler(make_config(search_values=["match"], retry_backoff=0.01))
+    results = crawler.crawl_and_search(build_searches(["match"]))
+
+    assert [record.url for record in results["text:match"]] == ["https://example.com/flaky"]
+    assert attempts.count("https://example.com/flaky") == 2
+    # A 404 is final
+    assert attempts.count("https://example.com/missing") == 1
+    assert crawler.stats.retries == 1
+    assert dict(crawler.stats.error_counts) == {"ConnectionError": 1, "HTTPError": 1}
+
+
+def test_circuit_breaker_pauses_failing_host(fake_site):
+    def serve(url, kwargs):
+        raise requests.Timeout("timed out")
+
+    calls = fake_site(serve)
+    crawler = WebCrawler(make_config(breaker_threshold=3, breaker_cooldown=60))
+    for i in range(10):
+        assert crawler.make_request(f"https://example.com/{i}") is None
+
+    assert len(calls) == 3
+    assert crawler.stats.error_count == 3
+    assert crawler.stats.error_counts["Timeout"] == 3
+
+    stats = crawler.stats
+    for i in range(500):
+        stats.add_error(f"error {i}", "ConnectionError")
+    assert len(stats.error_samples) == 100
+    assert stats.error_samples[-1] == "error 499"
+
+
+def test_dead_host_gives_up_on_held_back_urls(fake_site):
+    def serve(url, kwargs):
+        raise requests.ConnectionError("connection refused")
+
+    calls = fake_site(serve)
+    crawler = WebCrawler(make_config(
+        max_pages=100, breaker_threshold=2, breaker_cooldown=0.2, retry_backoff=0.01,
+    ))
+    for i in range(20):
+        crawler.claim_url(f"https://example.com/{i}", 1)
+
+    searches = build_searches(["value"])
+    results = {}
+    started = time.monotonic()
+    while crawler.url_queue.qsize() or crawler.pending_retries():
+        assert time.monotonic() - started < 5
+        crawler.release_due_retries()
+        try:
+            url, depth = crawler.url_queue.get_nowait()
+        except Empty:
+            time.sleep(0.01)
+            continue
+        crawler.process_url(url, depth, searches, results)
+
+    # Only trial requests reach the host once the breaker is open
+    assert len(calls) < 10
+    assert crawler.stats.error_counts["CircuitOpenError"] > 0
+
+
+def test_fetch_backends_record_compressed_transfer(fake_site):
+    import gzip
+
+    import httpx
+    from urllib3 import HTTPResponse
+
+    html = b"<p>" + b"compressible match " * 200 + b"</p>"
+    body = gzip.compress(html)
+    headers = {"Content-Type": "text/html", "Content-Encoding": "gzip"}
+
+    def serve(url, kwargs):
+        assert "gzip" in kwargs["headers"]["Accept-Encoding"]
+        raw = HTTPResponse(
+            body=io.BytesIO(body), headers=headers, preload_content=False, decode_content=True
+        )
+        return raw, headers
+
+    fake_site(serve)
+    crawler = WebCrawler(make_config())
+    response = crawler.make_request("https://example.com/")
+    assert response.content == html
+    assert crawler.stats.bytes_on_wire == len(body)
+    assert crawler.stats.bytes_decoded == len(html)
+
+    def handler(request):
+        if request.url.path == "/down":
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, headers=headers, content=iter([body]))
+
+    crawler = WebCrawler(make_config(fetch_backend="httpx"))
+    crawler.http_client = httpx.Client(transport=httpx.MockTransport(handler))
+    response = crawler.make_request("https://example.com/")
+    assert isinstance(response, requests.Response)
+    assert response.url == "https://example.com/"
+    assert "match" in response.text
+    assert crawler.stats.bytes_on_wire == len(body)
+    assert crawler.stats.bytes_decoded == len(html)
+
+    assert crawler.make_request("https://example.com/down") is None
+    assert crawler.stats.error_counts == {"ConnectionError": 1}
+
+    with pytest.raises(ValueError):
+        WebCrawler(make_config(fetch_backend="curl"))
+
+
+def test_httpx_clients_are_shared_and_closed():
+    import httpx
+
+    def handler(request):
+        return httpx.Response(200, headers={"Content-Type": "text/html"}, content=b"<p>match</p>")
+
+    crawler = WebCrawler(make_config(fetch_backend="httpx", search_values=["match"]))
+    crawler.http_client.close()
+    crawler.http_client = httpx.Client(transport=httpx.MockTransport(handler))
+    results = crawler.crawl_and_search(build_searches(["match"]))
+    assert len(results["text:match"]) == 1
+    assert crawler.http_client.is_closed
+
+    batch = BatchCrawler([
+        make_config(base_url="https://one.example", fetch_backend="httpx"),
+        make_config(base_url="https://two.example", fetch_backend="httpx"),
+    ])
+    assert batch.crawlers[0].http_client is batch.crawlers[1].http_client is batch.http_client
+    batch.http_client.close()
+    batch.http_client = httpx.Client(transport=httpx.MockTransport(handler))
+    for site in batch.crawlers:
+        site.http_client = batch.http_client
+    batch.crawl_and_search(build_searches(["match"]))
+    assert batch.http_client.is_closed
+    # Closing a site's crawler leaves the shared client alone
+    shared = httpx.Client()
+    site = WebCrawler(make_config(fetch_backend="httpx"), http_client=shared)
+    site.close()
+    assert not shared.is_closed
+    shared.close()
+
+
+def test_spilling_queue_keeps_memory_bounded(tmp_path):
+    queue = SpillingQueue(memory_limit=3, spill_dir=str(tmp_path), segment_items=4)
+    for i in range(10):
+        queue.put((f"/p{i}", 1))
+    assert len(queue.queue) == 3
+    assert queue.qsize() == 10
+    assert len(list(tmp_path.rglob("*.jsonl"))) == 2
+
+    taken = [queue.get_nowait()[0] for _ in range(5)]
+    queue.put(("/p10", 2))
+    assert queue.snapshot() == [(f"/p{i}", 1) for i in range(5, 10)] + [("/p10", 2)]
+    while not queue.empty():
+        taken.append(queue.get_nowait()[0])
+        assert len(queue.queue) <= 3
+    assert taken == [f"/p{i}" for i in range(11)]
+    assert not list(tmp_path.rglob("*.jsonl"))
+
+    for i in range(6):
+        queue.put((f"/q{i}", 1))
+    queue.clear()
+    # Only the 11 items taken earlier are still unfinished
+    assert queue.empty() and queue.unfinished_tasks == 11
+
+
+def test_crawl_with_spilled_frontier_fetches_each_url_once(fake_site, tmp_path):
+    # Every page links to the same 20 pages, most of them already queued
+    links = "".join(f'<a href="/p{i}">x</a>' for i in range(20))
+    fetched = fake_site(lambda url, kwargs: f"<p>{url.rsplit('/', 1)[-1]} match</p>{links}")
+    crawler = WebCrawler(make_config(
+        search_values=["match"], max_pages=50, dedupe_content=False, frontier_memory_limit=2,
+        frontier_spill_dir=str(tmp_path),
+    ))
+    results = crawler.crawl_and_search(build_searches(["match"]))
+
+    assert crawler.stats.pages_visited == 21
+    assert len(results["text:match"]) == 21
+    # The base URL is fetched twice: connection test and crawl
+    assert len(fetched) == len(set(fetched)) + 1
+
+
+def test_result_index_dedupes_with_capped_snippets(tmp_path):
+    paragraphs = "".join(f"<p>line {i} contact</p>" for i in range(5000))
+    soup = BeautifulSoup(f"<body data-x='contact'>{paragraphs}</body>", "html.parser")
+    body = soup.body
+    text_nodes = search_html(soup, "text", "contact")
+    results = {
+        "text:contact": [MatchRecord(f"https://example.com/{i % 50}", node) for i, node in enumerate(text_nodes)],
+        "attr:contact": [MatchRecord("https://example.com/0", body, "CSS display:none")] * 20000,
+    }
+
+    index = ResultIndex.from_results(results, ["contact"])
+    matches = index.matches("contact")
+
+    # 5000 distinct text nodes plus the body once
+    assert len(matches) == 5001
+    summary = matches[-1]
+    assert summary.tag == "body" and summary.attrs == {"data-x": "contact"}
+    assert summary.snippet.startswith("line 0 contactline 1 contact")
+    assert len(summary.snippet) == 303 and summary.snippet.endswith("...")
+    assert matches[0].tag is None and matches[0].parent == "p"
+
+    filename = tmp_path / "report.txt"
+    export_results_to_file(results, ["contact"], filename=str(filename), index=index)
+    report = filename.read_text()
+    assert "Found 5001 unique occurrence(s):" in report
+    assert "Visibility: Hidden (CSS display:none)" in report
+
+
+def test_serialized_results_use_capped_snippets():
+    paragraphs = "".join(f"<p>line {i}</p>" for i in range(5000))
+    soup = BeautifulSoup(f"<body data-x='contact'>{paragraphs}</body>", "html.parser")
+    serialized = serialize_results({"attr:contact": [MatchRecord("https://example.com/", soup.body)]})
+    text = serialized["attr:contact"][0]["text"]
+    assert text.startswith("line 0line 1") and text.endswith("...")
+    assert len(text) == 303
+
+    # API crawls serialize the results and never read the report index
+    assert WebCrawler(make_config(), index_results=False).result_index is None
+
+
+def test_matcher_finds_values_across_chunk_boundaries():
+    matcher = AssetMatcher(build_searches(["api_key", r"regex:sk_live_\w{8}"]))
+    chunks = ['{"config": {"API_', 'KEY": "sk_li', 've_abcd1234"}}']
+    found = matcher.scan(chunks)
+    assert [hit.strip() for hit in found["asset:api_key"]] == ['{"config": {"API_KEY": "sk_li']
+    assert len(found["asset:regex:sk_live_\\w{8}"]) == 1
+    # Matches inside the carried-over text are not reported twice
+    assert matcher.scan(["api_key", "", "x"]) == {"asset:api_key": ["api_key"]}
+
+
+def test_assets_are_scanned_once_within_budget(fake_site):
+    app_js = b"var token = 'secret-token';" + b" " * 300_000 + b"var late = 'secret-late';"
+    pages = {
+        "https://example.com/a": (
+            '<script src="/static/app.js"></script>'
+            '<script src="https://cdn.example.net/lib.js"></script>'
+            '<link rel="preload" as="fetch" href="/data/config.json">'
+            '<script type="application/json">{"user": "secret-inline"}</script>'
+            '<a href="/b">b</a>'
+        ),
+        "https://example.com/b": '<script src="/static/app.js"></script><p>other page</p>',
+    }
+    fetched = fake_site({
+        **{url: (body, {"Content-Type": "text/html"}) for url, body in pages.items()},
+        "https://example.com/static/app.js": (app_js, {"Content-Type": "application/javascript"}),
+        "https://example.com/data/config.json": (b'{"key": "secret-json"}', {"Content-Type": "application/json"}),
+    })
+    crawler = WebCrawler(make_config(
+        search_values=["secret"], scan_assets=True, asset_byte_budget=200_000,
+    ))
+    searches = build_searches(["secret"])
+    results = {}
+    for url in pages:
+        crawler.process_url(url, 0, searches, results)
+
+    assert fetched.count("https://example.com/static/app.js") == 1
+    assert not any("cdn.example.net" in url for url in fetched)
+    # The budget ran out partway through app.js, so config.json was skipped
+    assert "https://example.com/data/config.json" not in fetched
+    assert crawler.stats.asset_bytes == 200_000
+    matches = {(record.url, str(record.element).strip()) for record in results["asset:secret"]}
+    assert matches == {
+        ("https://example.com/a", '{"user": "secret-inline"}'),
+        ("https://example.com/static/app.js", "var token = 'secret-token';"),
+    }
+    assert crawler.found_values == {"secret"}
+    summaries = crawler.result_index.matches("secret")
+    assert {summary.url for summary in summaries} == {"https://example.com/a", "https://example.com/static/app.js"}
+
+
+def test_inline_json_uses_the_page_encoding(fake_site):
+    html = '<script type="application/json">{"city": "Liège"}</script>'
+    fake_site({
+        "https://example.com/": (
+            html.encode("latin-1"), {"Content-Type": "text/html; charset=iso-8859-1"},
+        ),
+    })
+    crawler = WebCrawler(make_config(search_values=["Liège"], scan_assets=True))
+    page = crawler.crawl_page("https://example.com/", 0, build_searches(["Liège"]))
+    assert [str(record.element) for record in page.matches["asset:Liège"]] == ['{"city": "Liège"}']
@@ -0,0 +1,83 @@
+import sys
+from dataclasses import asdict
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from frontier_store import FrontierStore
+from wheres_my_value import run_frontier_worker
+from test_crawler import make_config
+
+
+def test_lease_dedupe_and_expiry(tmp_path):
+    store = FrontierStore(str(tmp_path / "frontier.db"), lease_seconds=0.0)
+    assert store.add_urls([("https://example.com/", 0), ("https://example.com/a", 1)]) == 2
+    assert store.add_urls([("https://example.com/a", 1)]) == 0
+
+    first = store.lease("w1", 10, max_pages=10)
+    assert [url for url, _ in first] == ["https://example.com/", "https://example.com/a"]
+
+    # Leases expire immediately, so a second worker picks the URLs up again
+    second = store.lease("w2", 10, max_pages=10)
+    assert len(second) == 2
+    assert not store.complete("w1", "https://example.com/", {}, {})
+    match = {"text": "x", "hidden": None}
+    assert store.complete("w2", "https://example.com/", {"text:x": [match]}, {"https://example.com/b": 1})
+    assert store.results(["text:x"]) == {
+        "text:x": [{"url": "https://example.com/", "text": "x", "hidden": None}]
+    }
+    assert store.add_urls([("https://example.com/b", 1)]) == 0
+
+
+def test_frontier_worker_drains_store(tmp_path, fake_site):
+    fake_site({
+        "https://example.com": '<a href="/a">a</a> match',
+        "https://example.com/a": "match again",
+    })
+    path = str(tmp_path / "frontier.db")
+    store = FrontierStore(path)
+    store.save_config(asdict(make_config(search_values=["match"])))
+    store.add_urls([("https://example.com", 0)])
+
+    assert run_frontier_worker(path, "w1", poll_interval=0.0) == 2
+    assert store.found_values() == ["match"]
+    assert [item["url"] for item in store.results()["text:match"]] == [
+        "https://example.com",
+        "https://example.com/a",
+    ]
+
+
+def test_transient_failures_are_released_not_failed(tmp_path, fake_site):
+    store = FrontierStore(str(tmp_path / "frontier.db"))
+    store.add_urls([("https://example.com/", 0)])
+    assert store.lease("w1", 1, max_pages=10) == [("https://example.com/", 0)]
+    store.release("w1", "https://example.com/", delay=60)
+    # Released URLs wait out their delay and still count as outstanding
+    assert store.lease("w2", 1, max_pages=10) == []
+    assert not store.is_finished(max_pages=10)
+    store.release("w2", "https://example.com/", delay=0)  # not w2's lease
+    assert store.lease("w2", 1, max_pages=10) == []
+
+    pages = {
+        "https://example.com": '<a href="/flaky">f</a><a href="/missing">m</a>',
+        "https://example.com/flaky": "match",
+    }
+
+    def serve(url, kwargs):
+        if url.endswith("/flaky") and attempts.count(url) == 1:
+            raise requests.ConnectionError("reset")
+        return pages.get(url, ("", {}, 404))
+
+    attempts = fake_site(serve)
+    path = str(tmp_path / "worker.db")
+    store = FrontierStore(path)
+    store.save_config(asdict(make_config(search_values=["match"], retry_backoff=0.01)))
+    store.add_urls([("https://example.com", 0)])
+
+    assert run_frontier_worker(path, "w1", poll_interval=0.0) == 2
+    assert attempts.count("https://example.com/flaky") == 2
+    assert store.visited_urls() == ["https://example.com", "https://example.com/flaky"]
+    # The 404 is permanent
+    assert store.is_finished(max_pages=10)
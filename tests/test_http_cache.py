@@ -0,0 +1,89 @@
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from http_cache import HttpCache, freshness_lifetime, is_storable
+from wheres_my_value import WebCrawler
+from test_crawler import make_config
+
+
+def test_freshness_from_cache_headers():
+    now = 1_700_000_000.0
+    assert freshness_lifetime({"cache-control": "public, max-age=300", "age": "100"}, now) == 200
+    assert freshness_lifetime({"cache-control": "no-cache, max-age=300"}, now) == 0
+    assert freshness_lifetime({
+        "date": "Tue, 14 Nov 2023 22:13:20 GMT",
+        "expires": "Tue, 14 Nov 2023 22:23:20 GMT",
+    }, now) == 600
+    assert freshness_lifetime({"expires": "0"}, now) == 0
+    # Heuristic: 10% of the time since the last modification
+    assert freshness_lifetime({
+        "date": "Tue, 14 Nov 2023 22:13:20 GMT",
+        "last-modified": "Tue, 14 Nov 2023 19:26:40 GMT",
+    }, now) == 1000
+    assert not is_storable({"cache-control": "no-store"})
+
+
+def test_bodies_are_shared_and_evicted_lru(tmp_path):
+    cache = HttpCache(str(tmp_path), max_bytes=250)
+    headers = {"Cache-Control": "max-age=60", "Content-Encoding": "gzip"}
+    cache.put("https://example.com/a", "https://example.com/a", headers, b"a" * 100)
+    cache.put("https://example.com/a?x=1", "https://example.com/a", headers, b"a" * 100)
+    assert cache.size() == 100
+
+    cached = cache.get("https://example.com/a?x=1")
+    assert cached.fresh and cached.body == b"a" * 100
+    # Stored bodies are decoded
+    assert cached.headers == {"cache-control": "max-age=60"}
+
+    cache.put("https://example.com/b", "https://example.com/b", headers, b"b" * 100)
+    cache.get("https://example.com/a")
+    cache.put("https://example.com/c", "https://example.com/c", headers, b"c" * 100)
+    # b was used least recently
+    assert cache.get("https://example.com/b") is None
+    assert cache.get("https://example.com/a") is not None
+    assert cache.size() == 200
+
+    # Replacing an entry drops the body nothing refers to any more
+    cache.put("https://example.com/c", "https://example.com/c", headers, b"d" * 100)
+    assert cache.size() == 200
+    assert sum(len(files) for _, _, files in os.walk(tmp_path / "bodies")) == 2
+
+
+def test_crawler_reuses_and_revalidates_cached_pages(tmp_path, fake_site):
+    requests_sent = []
+
+    def serve(url, kwargs):
+        etag = kwargs["headers"].get("If-None-Match")
+        requests_sent.append((url, etag))
+        if etag == '"v1"':
+            return "", {"Cache-Control": "max-age=60"}, 304
+        headers = {"Content-Type": "text/html", "ETag": '"v1"'}
+        if url.endswith("/fresh"):
+            headers["Cache-Control"] = "max-age=60"
+        return "<p>cached match</p>", headers
+
+    fake_site(serve)
+    config = make_config(cache_dir=str(tmp_path))
+    first = WebCrawler(config)
+    assert first.make_request("https://example.com/fresh").text == "<p>cached match</p>"
+    first.make_request("https://example.com/stale")
+
+    second = WebCrawler(config)
+    fresh = second.make_request("https://example.com/fresh")
+    stale = second.make_request("https://example.com/stale")
+    assert fresh.from_cache and fresh.text == "<p>cached match</p>"
+    assert stale.from_cache and stale.text == "<p>cached match</p>"
+    assert requests_sent == [
+        ("https://example.com/fresh", None),
+        ("https://example.com/stale", None),
+        ("https://example.com/stale", '"v1"'),
+    ]
+    assert second.stats.cache_hits == 2
+    assert second.stats.cache_revalidated == 1
+
+    # The 304 made the stale entry fresh again
+    assert WebCrawler(config).make_request("https://example.com/stale").from_cache
+    assert len(requests_sent) == 3
@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Cumulative import budget for the crawler module, in microseconds. Override
+# with IMPORT_TIME_BUDGET_US on slow machines.
+IMPORT_TIME_BUDGET_US = int(os.environ.get("IMPORT_TIME_BUDGET_US", "150000"))
+
+# Modules that must only load once a crawl starts
+LAZY_MODULES = [
+    "requests",
+    "bs4",
+    "concurrent.futures",
+    "multiprocessing",
+    "sqlite3",
+    "urllib.robotparser",
+]
+
+
+def import_profile(module: str, lazy_modules=LAZY_MODULES):
+    code = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {list(lazy_modules)!r} if m in sys.modules))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time: <self us> | <cumulative us> | <module>"
+        _, cumulative_us, name = line.split("|")
+        cumulative[name.strip()] = int(cumulative_us)
+    return proc.stdout.strip(), cumulative
+
+
+def test_crawler_import_is_lazy_and_fast():
+    loaded, cumulative = import_profile("wheres_my_value")
+    assert loaded == ""
+    assert cumulative["wheres_my_value"] < IMPORT_TIME_BUDGET_US
+
+
+def test_api_import_does_not_load_crawler_dependencies():
+    # FastAPI itself pulls in concurrent.futures, so only check our own deps
+    loaded, _ = import_profile("api.server", ["requests", "bs4", "sqlite3", "urllib.robotparser"])
+    assert loaded == ""
@@ -3,23 +3,47 @@
 Originally the script was written to find a specific form element by ID on a
 website suffering from spam.  The crawler searches pages for arbitrary values
 and outputs where matches are found.
+
+Importing the module is kept cheap because the serverless API imports it on
+every cold start: ``requests``, BeautifulSoup and the thread/process pools are
+imported inside the functions that use them, so they load on the first crawl.
 """
 
+from __future__ import annotations
+
+import base64
+import codecs
+import fnmatch
+import functools
+import hashlib
+import heapq
+import hmac
+import itertools
 import logging
-import requests
-from bs4 import BeautifulSoup, NavigableString, Tag
-from typing import List, Optional, Set, Dict, Union, Tuple, Any, Callable
-from urllib.parse import urljoin, urlparse
+import random
+import re
+import tempfile
+import zlib
+from html import unescape
+from typing import TYPE_CHECKING, Iterable, Iterator, List, NamedTuple, Optional, Set, Dict, Union, Tuple, Any, Callable
+from urllib.parse import quote, unquote, urldefrag, urljoin, urlparse, urlunparse
 import time
 import json
 import os
 from datetime import datetime
-from urllib.robotparser import RobotFileParser
-import concurrent.futures
-from queue import Queue
+from queue import Empty, Queue
 import threading
-from dataclasses import dataclass
-from collections import defaultdict
+from dataclasses import asdict, dataclass, field, replace
+from collections import OrderedDict, defaultdict, deque
+
+if TYPE_CHECKING:
+    import argparse
+
+    import httpx
+    import requests
+    from bs4 import BeautifulSoup, NavigableString, Tag
+
+    from http_cache import CachedResponse
 
 # Common non-HTML file extensions to skip
 SKIP_EXTENSIONS = {
@@ -37,8 +61,120 @@ SKIP_EXTENSIONS = {
     '.ico', '.woff', '.woff2', '.ttf', '.eot', '.map'
 }
 
-# Limit the number of links parsed from a page
-MAX_LINKS_PER_PAGE = 50
+# Suffix tuple for a single str.endswith() check
+SKIP_SUFFIXES = tuple(sorted(SKIP_EXTENSIONS))
+
+# Link extraction works on the raw bytes of a page: comments, scripts and
+# styles are skipped, every other <a> or <base> tag is captured
+LINK_TAG_PATTERN = re.compile(
+    rb'<!--.*?-->'
+    rb'|<(script|style)\b[^>]*>.*?</\1\s*>'
+    rb'|<(a|base)\b([^>]*)>',
+    re.IGNORECASE | re.DOTALL,
+)
+HREF_PATTERN = re.compile(
+    rb'''\bhref\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))''',
+    re.IGNORECASE,
+)
+SRC_PATTERN = re.compile(
+    rb'''\bsrc\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))''',
+    re.IGNORECASE,
+)
+TYPE_PATTERN = re.compile(
+    rb'''\btype\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))''',
+    re.IGNORECASE,
+)
+# Asset extraction: <script> tags with their contents, <link> and <base> tags
+ASSET_TAG_PATTERN = re.compile(
+    rb'<!--.*?-->'
+    rb'|<script\b([^>]*)>(.*?)</script\s*>'
+    rb'|<(link|base)\b([^>]*)>',
+    re.IGNORECASE | re.DOTALL,
+)
+
+# Optional asset scan (CrawlerConfig.scan_assets). <link> targets with these
+# extensions are scanned along with every <script src>; responses must have
+# one of these words in their content type.
+ASSET_EXTENSIONS = ('.js', '.mjs', '.json')
+ASSET_CONTENT_TYPES = ('javascript', 'ecmascript', 'json')
+# Characters carried over between chunks so regex matches can span them
+ASSET_SCAN_OVERLAP = 1024
+# Characters of context kept on either side of a match in an asset
+ASSET_CONTEXT = 80
+# Matches kept per search value and asset
+ASSET_MATCH_LIMIT = 20
+ASSET_HIDDEN_REASON = 'Script or JSON data, not rendered'
+
+# Response types parsed as HTML; anything else is dropped unread
+HTML_CONTENT_TYPES = {'text/html', 'application/xhtml+xml'}
+
+# Read streamed response bodies in chunks of this size
+BODY_CHUNK_SIZE = 64 * 1024
+
+# Class names commonly used to hide elements
+HIDDEN_CLASSES = {
+    'hidden', 'hide', 'is-hidden', 'd-none', 'invisible',
+    'visually-hidden', 'sr-only', 'screen-reader-text',
+}
+
+# Tags whose content is never rendered
+NON_RENDERED_TAGS = {'script', 'style', 'template'}
+
+VISIBILITY_HIDDEN_REASON = 'CSS visibility:hidden'
+
+# Version of the continuation token format produced by WebCrawler
+CONTINUATION_VERSION = 2
+
+# Largest decompressed continuation token accepted by resume_from
+MAX_TOKEN_BYTES = 8 * 1024 * 1024
+
+# Key for signing continuation tokens. Set it to the same value on every
+# instance that may resume a crawl; otherwise each process uses its own.
+CONTINUATION_SECRET_ENV = 'WMV_CONTINUATION_SECRET'
+
+# Stop claiming new pages when less than this many seconds of budget remain
+MIN_PAGE_BUDGET = 0.5
+
+# Process-level cache lifetimes and sizes (seconds / entries)
+ROBOTS_CACHE_TTL = 3600.0
+ROBOTS_CACHE_SIZE = 256
+DNS_CACHE_TTL = 300.0
+DNS_CACHE_SIZE = 1024
+# can_fetch answers remembered per robots.txt before the memo is reset
+ROBOTS_MEMO_SIZE = 10000
+
+# Search types applied to every search value
+SEARCH_TYPES = ('text', 'id', 'class', 'attr')
+
+# Search values written as "<type>:<pattern>" run only that search type,
+# with the pattern compiled once per process
+STRUCTURED_SEARCH_TYPES = ('regex', 'css')
+
+# Pages with fewer words than this are only deduplicated on exact content
+SIMHASH_MIN_TOKENS = 20
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4
+
+# Characters of element text kept for reports
+SNIPPET_LENGTH = 300
+
+# Lock shards for the per-crawl URL claim set
+STATE_SHARDS = 64
+# URLs per frontier segment file once the in-memory frontier is full
+FRONTIER_SEGMENT_ITEMS = 50000
+# Seconds between history file writes while a crawl is running
+HISTORY_SAVE_INTERVAL = 30.0
+
+# Longest delay before a failed URL is retried (seconds)
+RETRY_BACKOFF_MAX = 60.0
+# HTTP statuses worth retrying; other 4xx responses are final
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+# Most recent error messages kept by CrawlerStats
+ERROR_SAMPLE_SIZE = 100
+
+# HTTP clients CrawlerConfig.fetch_backend can select. "httpx" multiplexes
+# requests over HTTP/2 when the h2 package is installed.
+FETCH_BACKENDS = ('requests', 'httpx')
 
 # Default headers
 DEFAULT_HEADERS = {
@@ -49,10 +185,6 @@ DEFAULT_HEADERS = {
     'Upgrade-Insecure-Requests': '1'
 }
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-)
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -70,14 +202,959 @@ class CrawlerConfig:
     respect_robots: bool
     use_history: bool
     history_file: Optional[str]
+    # Skip searching pages whose content was already seen under another URL
+    dedupe_content: bool = True
+    # Maximum SimHash distance for near-duplicates; 0 only skips exact copies.
+    # Near-duplicates must also contain the search values equally often.
+    near_duplicate_distance: int = 0
+    # Responses larger than this are aborted while streaming; 0 disables the cap
+    max_body_bytes: int = 5 * 1024 * 1024
+    # Cache DNS lookups for the whole process (see install_dns_cache)
+    cache_dns: bool = True
+    # Maximum links queued from a single page; None means no limit
+    max_links_per_page: Optional[int] = None
+    # Retries for timeouts, connection errors and 429/5xx responses
+    max_retries: int = 2
+    # First retry delay in seconds, doubled per attempt and jittered
+    retry_backoff: float = 1.0
+    # Consecutive failures after which a host is paused for breaker_cooldown seconds
+    breaker_threshold: int = 5
+    breaker_cooldown: float = 30.0
+    # HTTP client used for fetches, one of FETCH_BACKENDS
+    fetch_backend: str = 'requests'
+    # Queued URLs kept in memory; the rest spill to temporary files (None: no cap)
+    frontier_memory_limit: Optional[int] = 100000
+    # Where spilled frontier segments go; None uses the system temp directory
+    frontier_spill_dir: Optional[str] = None
+    # Crawl scope rules (see UrlRules). Links matching an exclude rule are
+    # skipped; with include rules, only links matching one of them are crawled.
+    include_rules: List[str] = field(default_factory=list)
+    exclude_rules: List[str] = field(default_factory=list)
+    # Directory of the on-disk HTTP cache (see http_cache.py); None disables it
+    cache_dir: Optional[str] = None
+    cache_max_bytes: int = 512 * 1024 * 1024
+    # Also search same-origin scripts and JSON referenced by pages, and
+    # inline JSON, as raw text (see WebCrawler.scan_assets)
+    scan_assets: bool = False
+    # Asset bytes scanned per crawl before asset fetches stop
+    asset_byte_budget: int = 20 * 1024 * 1024
+
+class MatchRecord(NamedTuple):
+    """A search match and why it is hidden (``None`` when visible)"""
+    url: str
+    element: Any
+    hidden_reason: Optional[str] = None
+
+@dataclass
+class PageResult:
+    """Matches and outgoing links found on a single crawled page"""
+    url: str
+    depth: int
+    matches: Dict[str, List[MatchRecord]]
+    links: Dict[str, int]
+    # URL of the earlier page this one duplicates, if any
+    duplicate_of: Optional[str] = None
+
+def element_snippet(element: Union[Tag, NavigableString], limit: int = SNIPPET_LENGTH) -> str:
+    """Stripped element text, cut at ``limit`` characters.
+
+    Only the text needed for the snippet is read, so a match on ``<body>``
+    costs no more than a match on a single text node.
+    """
+    # Text nodes are str subclasses; checking for str avoids a bs4 import per match
+    if isinstance(element, str):
+        text = str(element)
+    else:
+        text = ''
+        for string in element.strings:
+            text += string
+            if len(text.lstrip()) > limit:
+                break
+    text = text.strip()
+    return text if len(text) <= limit else text[:limit] + '...'
+
+class MatchSummary(NamedTuple):
+    """The parts of a match shown in reports, extracted once from the element"""
+    url: str
+    # Tag name, or None for a text node
+    tag: Optional[str]
+    # Tag name of a text node's parent
+    parent: Optional[str]
+    attrs: Dict[str, Any]
+    snippet: str
+    hidden_reason: Optional[str]
+
+    @classmethod
+    def from_record(cls, record: MatchRecord) -> MatchSummary:
+        element = record.element
+        # A NavigableString (text node); Tags are not str
+        if isinstance(element, str):
+            parent = element.parent.name if element.parent is not None else None
+            return cls(record.url, None, parent, {}, element_snippet(element), record.hidden_reason)
+        return cls(
+            record.url, element.name, None, dict(element.attrs),
+            element_snippet(element), record.hidden_reason,
+        )
+
+class ResultIndex:
+    """Unique matches per search value, keyed by (value, url, snippet).
+
+    Matches are added as pages are recorded, so reports don't have to walk
+    the result elements again. Like the reports before it, the index treats
+    matches on the same page with the same text as one occurrence.
+    """
+
+    def __init__(self, search_values: List[str]):
+        self._values_by_key = {
+            key: value for value in search_values for key in search_keys(value)
+        }
+        self._matches: Dict[str, Dict[Tuple[str, str], MatchSummary]] = {
+            value: {} for value in search_values
+        }
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_results(cls, results: Dict[str, List[MatchRecord]], search_values: List[str]) -> ResultIndex:
+        index = cls(search_values)
+        # Keys in search type order, as the reports list them
+        for value in search_values:
+            for key in search_keys(value):
+                index.add(key, results.get(key, ()))
+        return index
+
+    def add(self, key: str, records: Iterable[MatchRecord]) -> None:
+        value = self._values_by_key.get(key)
+        if value is None:
+            return
+        summaries = [MatchSummary.from_record(record) for record in records]
+        with self._lock:
+            matches = self._matches[value]
+            for summary in summaries:
+                matches.setdefault((summary.url, summary.snippet), summary)
+
+    def matches(self, value: str) -> List[MatchSummary]:
+        with self._lock:
+            return list(self._matches.get(value, {}).values())
+
+def simhash(text: str) -> Optional[int]:
+    """64-bit SimHash over word trigrams, or ``None`` for very short texts"""
+    tokens = re.findall(r'\w+', text.lower())
+    if len(tokens) < SIMHASH_MIN_TOKENS:
+        return None
+    shingles: Dict[str, int] = defaultdict(int)
+    for i in range(len(tokens) - 2):
+        shingles[' '.join(tokens[i:i + 3])] += 1
+
+    weights = [0] * SIMHASH_BITS
+    for shingle, count in shingles.items():
+        digest = int.from_bytes(
+            hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big'
+        )
+        for bit in range(SIMHASH_BITS):
+            if digest >> bit & 1:
+                weights[bit] += count
+            else:
+                weights[bit] -= count
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+@functools.lru_cache(maxsize=32)
+def raw_value_patterns(searches: Tuple[Tuple[str, str], ...]) -> Optional[List[re.Pattern]]:
+    """Patterns counted in a page's raw HTML before it may count as a near-duplicate.
+
+    SimHash only covers the page text, so a page that adds a matching
+    attribute or a few matching words can look like an earlier page. Both
+    pages must contain these patterns equally often. Returns ``None`` when a
+    ``css:`` search can't be checked on raw HTML.
+    """
+    patterns: List[re.Pattern] = []
+    for search_type, value in searches:
+        if search_type == 'css':
+            return None
+        if search_type == 'regex':
+            patterns.append(compile_regex(value))
+        elif search_type == 'text':
+            # One set of patterns covers the text, id, class and attr searches
+            patterns.append(re.compile(re.escape(value), re.IGNORECASE))
+            if value.startswith('<') and value.endswith('>'):
+                patterns.append(re.compile(rf'<{re.escape(value[1:-1])}\b', re.IGNORECASE))
+            elif '=' in value:
+                attr_value = value.split('=', 1)[1].strip('"\'')
+                patterns.append(re.compile(re.escape(attr_value), re.IGNORECASE))
+    return patterns
+
+def raw_value_counts(text: str, patterns: List[re.Pattern]) -> Tuple[int, ...]:
+    return tuple(sum(1 for _ in pattern.finditer(text)) for pattern in patterns)
+
+class ContentIndex:
+    """Remember page content so duplicate pages can reuse earlier results.
+
+    Exact copies are found by a hash of the response body. Near-duplicates
+    are found by SimHash: the fingerprint is split into bands and any page
+    within ``max_distance`` bits must share at least one band exactly, so
+    only pages in matching bands are compared. A near-duplicate must also
+    have the same :func:`raw_value_counts` as the page it duplicates.
+    """
+
+    def __init__(self, max_distance: int = 0):
+        self.max_distance = max_distance
+        self._exact: Dict[bytes, PageResult] = {}
+        self._bands: Dict[
+            Tuple[int, int], List[Tuple[int, Tuple[int, ...], PageResult]]
+        ] = defaultdict(list)
+        self._band_bits = SIMHASH_BITS // SIMHASH_BANDS
+        self._lock = threading.Lock()
+
+    def _band_keys(self, fingerprint: int) -> List[Tuple[int, int]]:
+        mask = (1 << self._band_bits) - 1
+        return [
+            (band, fingerprint >> (band * self._band_bits) & mask)
+            for band in range(SIMHASH_BANDS)
+        ]
+
+    def find_exact(self, digest: bytes) -> Optional[PageResult]:
+        with self._lock:
+            return self._exact.get(digest)
+
+    def find_near(self, fingerprint: Optional[int], counts: Tuple[int, ...]) -> Optional[PageResult]:
+        if fingerprint is None or self.max_distance <= 0:
+            return None
+        with self._lock:
+            for key in self._band_keys(fingerprint):
+                for other, other_counts, page in self._bands.get(key, ()):
+                    if (
+                        other_counts == counts
+                        and bin(fingerprint ^ other).count('1') <= self.max_distance
+                    ):
+                        return page
+        return None
+
+    def add(
+        self,
+        digest: bytes,
+        fingerprint: Optional[int],
+        page: PageResult,
+        counts: Tuple[int, ...] = (),
+    ) -> None:
+        with self._lock:
+            self._exact.setdefault(digest, page)
+            if fingerprint is not None and self.max_distance > 0:
+                for key in self._band_keys(fingerprint):
+                    self._bands[key].append((fingerprint, counts, page))
+
+def parse_search_value(value: str) -> Optional[Tuple[str, str]]:
+    """Split ``regex:...``/``css:...`` values into ``(search_type, pattern)``"""
+    search_type, sep, pattern = value.partition(':')
+    if sep and search_type in STRUCTURED_SEARCH_TYPES and pattern:
+        return search_type, pattern
+    return None
+
+def search_keys(value: str) -> List[str]:
+    """Result keys produced for a search value"""
+    structured = parse_search_value(value)
+    if structured:
+        keys = [value]
+    else:
+        keys = [f"{search_type}:{value}" for search_type in SEARCH_TYPES]
+    if asset_key(*(structured or ('text', value))):
+        keys.append(f"asset:{value}")
+    return keys
+
+def asset_key(search_type: str, value: str) -> Optional[str]:
+    """Result key for asset matches of a search, if assets can be searched for it.
+
+    Assets are plain text, so only text and regex searches apply.
+    """
+    if search_type == 'text':
+        return f"asset:{value}"
+    if search_type == 'regex':
+        return f"asset:regex:{value}"
+    return None
+
+@functools.lru_cache(maxsize=256)
+def compile_regex(pattern: str) -> re.Pattern:
+    try:
+        return re.compile(pattern)
+    except re.error as e:
+        raise ValueError(f"Invalid regex {pattern!r}: {e}") from e
+
+@functools.lru_cache(maxsize=256)
+def compile_css(selector: str) -> Any:
+    import soupsieve
+
+    try:
+        return soupsieve.compile(selector)
+    except soupsieve.SelectorSyntaxError as e:
+        raise ValueError(f"Invalid CSS selector {selector!r}: {e}") from e
+
+def build_searches(search_values: List[str]) -> List[Tuple[str, str]]:
+    """Expand search values into ``(search_type, value)`` pairs.
+
+    Plain values run the text, id, class and attr searches. ``regex:<pattern>``
+    and ``css:<selector>`` values run only that search. Their patterns are
+    compiled here, so invalid ones raise ``ValueError`` before crawling.
+    """
+    searches: List[Tuple[str, str]] = []
+    for value in search_values:
+        structured = parse_search_value(value)
+        if structured is None:
+            searches.extend((search_type, value) for search_type in SEARCH_TYPES)
+            continue
+        search_type, pattern = structured
+        if search_type == 'regex':
+            compile_regex(pattern)
+        else:
+            compile_css(pattern)
+        searches.append(structured)
+    return searches
+
+def found_value_for(search_type: str, value: str) -> Optional[str]:
+    """The search value reported as found when a search has matches"""
+    if search_type == 'text':
+        return value
+    if search_type in STRUCTURED_SEARCH_TYPES:
+        return f"{search_type}:{value}"
+    return None
+
+def _attr_value(pattern: re.Pattern, attrs: bytes, encoding: str) -> Optional[str]:
+    match = pattern.search(attrs)
+    if match is None:
+        return None
+    raw = next(group for group in match.groups() if group is not None)
+    return unescape(raw.decode(encoding, errors='replace')).strip()
+
+def _base_url(tags: List[Tuple[bytes, bytes]], page_url: str, encoding: str) -> str:
+    """Resolve the first ``<base href>`` among ``(name, attrs)`` tags"""
+    for name, attrs in tags:
+        if name == b'base':
+            href = _attr_value(HREF_PATTERN, attrs, encoding)
+            if href:
+                return urljoin(page_url, href)
+    return page_url
+
+def extract_links(html: Union[bytes, str], page_url: str, encoding: str = 'utf-8') -> Iterator[str]:
+    """Yield absolute link URLs from raw HTML without building a DOM.
+
+    Relative links are resolved against the first ``<base href>`` if the
+    page has one, otherwise against ``page_url``. Fragments are dropped.
+    """
+    if isinstance(html, str):
+        html = html.encode(encoding, errors='replace')
+
+    tags = [
+        (match.group(2).lower(), match.group(3))
+        for match in LINK_TAG_PATTERN.finditer(html)
+        if match.group(2)
+    ]
+    base_url = _base_url(tags, page_url, encoding)
+    for name, attrs in tags:
+        if name != b'a':
+            continue
+        href = _attr_value(HREF_PATTERN, attrs, encoding)
+        if href:
+            yield urldefrag(urljoin(base_url, href))[0]
+
+def extract_assets(
+    html: Union[bytes, str], page_url: str, encoding: str = 'utf-8'
+) -> Tuple[List[str], List[bytes]]:
+    """Find the scripts and JSON a page references, without building a DOM.
+
+    Returns the absolute URLs of ``<script src>`` tags and of ``<link>``
+    targets ending in one of ``ASSET_EXTENSIONS`` (preloads, manifests),
+    and the contents of inline JSON scripts.
+    """
+    if isinstance(html, str):
+        html = html.encode(encoding, errors='replace')
+
+    tags: List[Tuple[bytes, bytes]] = []
+    inline_json: List[bytes] = []
+    for match in ASSET_TAG_PATTERN.finditer(html):
+        script_attrs, script_body, name, attrs = match.groups()
+        if script_attrs is not None:
+            tags.append((b'script', script_attrs))
+            script_type = _attr_value(TYPE_PATTERN, script_attrs, encoding) or ''
+            if 'json' in script_type.lower() and script_body.strip():
+                inline_json.append(script_body)
+        elif name is not None:
+            tags.append((name.lower(), attrs))
+
+    base_url = _base_url(tags, page_url, encoding)
+    urls: List[str] = []
+    for name, attrs in tags:
+        if name == b'script':
+            src = _attr_value(SRC_PATTERN, attrs, encoding)
+        elif name == b'link':
+            src = _attr_value(HREF_PATTERN, attrs, encoding)
+            if src and not urlparse(src).path.lower().endswith(ASSET_EXTENSIONS):
+                src = None
+        else:
+            continue
+        if src:
+            url = urldefrag(urljoin(base_url, src))[0]
+            if url not in urls:
+                urls.append(url)
+    return urls, inline_json
+
+class AssetMatcher:
+    """Text and regex searches compiled for scanning raw asset text.
+
+    Text is scanned a chunk at a time. The last ``overlap`` characters of a
+    chunk are searched again with the next one, so a match spanning two
+    chunks is found unless it is longer than ``ASSET_SCAN_OVERLAP``.
+    """
+
+    def __init__(self, searches: Iterable[Tuple[str, str]]):
+        self.patterns: List[Tuple[str, re.Pattern]] = []
+        self.overlap = 0
+        for search_type, value in searches:
+            key = asset_key(search_type, value)
+            if key is None:
+                continue
+            if search_type == 'text':
+                # Case-insensitive, like the text search on pages
+                self.patterns.append((key, re.compile(re.escape(value), re.IGNORECASE)))
+                self.overlap = max(self.overlap, len(value) - 1)
+            else:
+                self.patterns.append((key, compile_regex(value)))
+                self.overlap = ASSET_SCAN_OVERLAP
+
+    def scan(self, chunks: Iterable[str]) -> Dict[str, List[str]]:
+        """Context snippets of up to ``ASSET_MATCH_LIMIT`` matches per key"""
+        found: Dict[str, List[str]] = {}
+        tail = ''
+        for chunk in chunks:
+            window = tail + chunk
+            # Matches ending inside the carried-over tail were found last time
+            boundary = len(tail)
+            for key, pattern in self.patterns:
+                hits = found.setdefault(key, [])
+                if len(hits) >= ASSET_MATCH_LIMIT:
+                    continue
+                for match in pattern.finditer(window):
+                    if match.end() <= boundary or match.end() == match.start():
+                        continue
+                    start = max(match.start() - ASSET_CONTEXT, 0)
+                    hits.append(window[start:match.end() + ASSET_CONTEXT])
+                    if len(hits) >= ASSET_MATCH_LIMIT:
+                        break
+            tail = window[-self.overlap:] if self.overlap else ''
+        return {key: hits for key, hits in found.items() if hits}
+
+@functools.lru_cache(maxsize=32)
+def asset_matcher(searches: Tuple[Tuple[str, str], ...]) -> AssetMatcher:
+    return AssetMatcher(searches)
+
+class UrlRules:
+    """Crawl scope rules compiled into a single matcher.
+
+    A rule is a path prefix (``/blog/``), a glob (``glob:/tag/*``) or a
+    regular expression (``regex:[?&]page=``). Rules are matched against the
+    URL path plus query string. Prefixes are stored in a trie, and globs and
+    regexes are combined into one regex with a named group per rule, so a
+    lookup is one trie walk and one regex match however many rules there are.
+    Regexes that can't be combined (groups, backreferences, global flags)
+    are kept as separate patterns and searched after the combined one.
+    """
+
+    def __init__(self, rules: List[str]):
+        self.rules = list(rules)
+        self._trie: Dict[Optional[str], Any] = {}
+        self._separate: List[Tuple[int, re.Pattern]] = []
+        patterns = []
+        for index, rule in enumerate(self.rules):
+            if rule.startswith('regex:'):
+                pattern = rule[len('regex:'):]
+                try:
+                    compiled = re.compile(pattern)
+                except re.error as e:
+                    raise ValueError(f"Invalid regex in URL rule {rule!r}: {e}") from e
+                # Lazy prefix so the rule can match anywhere, like re.search
+                merged = f"(?P<r{index}>.*?(?:{pattern}))"
+                if compiled.groups == 0 and self._compiles(merged):
+                    patterns.append(merged)
+                else:
+                    # Group numbers and names would clash once combined
+                    self._separate.append((index, compiled))
+            elif rule.startswith('glob:'):
+                patterns.append(f"(?P<r{index}>{fnmatch.translate(rule[len('glob:'):])})")
+            elif rule.startswith('/'):
+                node = self._trie
+                for char in rule:
+                    node = node.setdefault(char, {})
+                # Keep the first rule if the same prefix is listed twice
+                node.setdefault(None, index)
+            else:
+                raise ValueError(
+                    f"URL rule {rule!r} must be a path starting with '/' or use glob: or regex:"
+                )
+        self._pattern = None
+        if patterns:
+            try:
+                self._pattern = re.compile('|'.join(patterns), re.DOTALL)
+            except re.error as e:
+                raise ValueError(f"Invalid URL rules {self.rules!r}: {e}") from e
+
+    @staticmethod
+    def _compiles(pattern: str) -> bool:
+        try:
+            re.compile(pattern)
+        except re.error:
+            return False
+        return True
+
+    def match(self, target: str) -> Optional[str]:
+        """The first rule matching ``target`` (path and query), or ``None``"""
+        node = self._trie
+        for char in target:
+            node = node.get(char)
+            if node is None:
+                break
+            if None in node:
+                return self.rules[node[None]]
+        if self._pattern is not None:
+            match = self._pattern.match(target)
+            if match is not None:
+                return self.rules[int(match.lastgroup[1:])]
+        for index, pattern in self._separate:
+            if pattern.search(target):
+                return self.rules[index]
+        return None
+
+def _url_digest(url: str) -> bytes:
+    return hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest()
+
+@functools.lru_cache(maxsize=None)
+def _continuation_secret() -> bytes:
+    secret = os.environ.get(CONTINUATION_SECRET_ENV, '')
+    return secret.encode('utf-8') if secret else os.urandom(32)
+
+def _token_mac(payload: bytes) -> bytes:
+    return hmac.new(_continuation_secret(), payload, hashlib.sha256).digest()
+
+def _crawl_fingerprint(config: CrawlerConfig) -> str:
+    """Identify a crawl by site and search values, for continuation tokens"""
+    key = json.dumps([config.base_url, sorted(config.search_values)])
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+
+class ShardedSet:
+    """Set split into independently locked shards.
+
+    :meth:`add` is an atomic check-and-insert, so threads adding different
+    items rarely wait on each other.
+    """
+
+    def __init__(self, shards: int = STATE_SHARDS):
+        self._shards: List[Set[Any]] = [set() for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+
+    def add(self, item: Any) -> bool:
+        """Add ``item``. Returns ``False`` if it was already present."""
+        index = hash(item) % len(self._shards)
+        with self._locks[index]:
+            shard = self._shards[index]
+            if item in shard:
+                return False
+            shard.add(item)
+            return True
+
+    def __contains__(self, item: Any) -> bool:
+        return item in self._shards[hash(item) % len(self._shards)]
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+class SpillingQueue(Queue):
+    """FIFO queue that keeps at most ``memory_limit`` items in memory.
+
+    Further items are appended to segment files in a temporary directory and
+    read back in batches as the in-memory part drains. Order is preserved,
+    and consumed segments are deleted.
+    """
+
+    def __init__(
+        self,
+        memory_limit: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+        segment_items: int = FRONTIER_SEGMENT_ITEMS,
+    ):
+        self.memory_limit = memory_limit
+        self.spill_dir = spill_dir
+        self.segment_items = segment_items
+        super().__init__()
+
+    # Queue calls the hooks below with its mutex held
+
+    def _init(self, maxsize: int) -> None:
+        self.queue: deque = deque()
+        self._spilled = 0
+        self._segments: deque = deque()
+        self._segment_ids = itertools.count()
+        self._writer = None
+        self._writer_path = ''
+        self._writer_count = 0
+        self._reader = None
+        self._tempdir = None
+
+    def _qsize(self) -> int:
+        return len(self.queue) + self._spilled
+
+    def _put(self, item: Any) -> None:
+        # Once anything is on disk, new items go behind it to keep FIFO order
+        if not self._spilled and (self.memory_limit is None or len(self.queue) < self.memory_limit):
+            self.queue.append(item)
+        else:
+            self._spill(item)
+
+    def _get(self) -> Any:
+        if not self.queue:
+            self._refill()
+        return self.queue.popleft()
+
+    def _spill(self, item: Any) -> None:
+        if self._writer is None:
+            if self._tempdir is None:
+                # Removed when the queue is garbage collected
+                self._tempdir = tempfile.TemporaryDirectory(prefix='frontier-', dir=self.spill_dir)
+            self._writer_path = os.path.join(self._tempdir.name, f"{next(self._segment_ids):08d}.jsonl")
+            self._writer = open(self._writer_path, 'w', encoding='utf-8')
+        self._writer.write(json.dumps(item) + '\n')
+        self._writer_count += 1
+        self._spilled += 1
+        if self._writer_count >= self.segment_items:
+            self._close_writer()
+
+    def _close_writer(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._segments.append(self._writer_path)
+            self._writer = None
+            self._writer_count = 0
+
+    def _refill(self) -> None:
+        """Load the next batch of spilled items into memory"""
+        while self._spilled and len(self.queue) < max(self.memory_limit, 1):
+            if self._reader is None:
+                if not self._segments:
+                    self._close_writer()
+                self._reader = open(self._segments[0], encoding='utf-8')
+            line = self._reader.readline()
+            if not line:
+                self._reader.close()
+                self._reader = None
+                os.remove(self._segments.popleft())
+                continue
+            self.queue.append(tuple(json.loads(line)))
+            self._spilled -= 1
+        if not self._spilled and self._reader is not None:
+            self._reader.close()
+            self._reader = None
+            os.remove(self._segments.popleft())
+
+    def snapshot(self) -> List[Any]:
+        """All queued items in order, including the spilled ones"""
+        with self.mutex:
+            items = list(self.queue)
+            if self._writer is not None:
+                self._writer.flush()
+            paths = list(self._segments) + ([self._writer_path] if self._writer is not None else [])
+            for index, path in enumerate(paths):
+                with open(path, encoding='utf-8') as f:
+                    if index == 0 and self._reader is not None:
+                        f.seek(self._reader.tell())
+                    items.extend(tuple(json.loads(line)) for line in f)
+            return items
+
+    def clear(self) -> None:
+        """Drop every queued item and mark it done"""
+        with self.mutex:
+            dropped = self._qsize()
+            if self._reader is not None:
+                self._reader.close()
+            if self._writer is not None:
+                self._writer.close()
+            if self._tempdir is not None:
+                self._tempdir.cleanup()
+            self._init(0)
+            self.unfinished_tasks -= dropped
+            if not self.unfinished_tasks:
+                self.all_tasks_done.notify_all()
+
+class CircuitOpenError(Exception):
+    """Raised instead of fetching from a host whose circuit breaker is open"""
+
+    def __init__(self, host: str, retry_after: float):
+        super().__init__(f"{host} is paused for {retry_after:.1f}s after repeated failures")
+        self.host = host
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """Pause fetching from hosts that keep failing.
+
+    After ``threshold`` consecutive failures a host is skipped for
+    ``cooldown`` seconds. Then a single trial request is let through: success
+    closes the breaker, another failure opens it again.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        # host -> [consecutive failures, monotonic time the pause ends]
+        self._hosts: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def retry_after(self, host: str) -> float:
+        """Seconds until ``host`` may be fetched again; 0 means go ahead"""
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or not state[1]:
+                return 0.0
+            remaining = state[1] - time.monotonic()
+            if remaining > 0:
+                return remaining
+            # Let this request through as the trial and hold back the others
+            state[1] = time.monotonic() + self.cooldown
+            return 0.0
+
+    def record_success(self, host: str) -> None:
+        if host in self._hosts:
+            with self._lock:
+                self._hosts.pop(host, None)
+
+    def record_failure(self, host: str) -> None:
+        with self._lock:
+            state = self._hosts.setdefault(host, [0, 0.0])
+            state[0] += 1
+            if state[0] >= self.threshold:
+                if not state[1]:
+                    logger.warning(
+                        f"{host} failed {int(state[0])} times in a row, "
+                        f"pausing it for {self.cooldown:.0f}s"
+                    )
+                state[1] = time.monotonic() + self.cooldown
+
+def is_retryable_error(error: Exception) -> bool:
+    """True for failures that may succeed later: timeouts, dropped
+    connections and 429/5xx responses"""
+    import requests
+
+    if isinstance(error, requests.HTTPError):
+        response = error.response
+        return response is not None and response.status_code in RETRYABLE_STATUSES
+    return isinstance(error, (
+        requests.Timeout,
+        requests.ConnectionError,
+        requests.exceptions.ChunkedEncodingError,
+    ))
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after ``ttl`` seconds.
+
+    An expired entry is still returned while a background thread reloads it,
+    so only the first lookup of a key waits for the loader.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._refreshing: Set[Any] = set()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any, loader: Callable[[Any], Any]) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                value, expires = entry
+                if expires <= time.monotonic() and key not in self._refreshing:
+                    self._refreshing.add(key)
+                    threading.Thread(
+                        target=self._refresh, args=(key, loader), daemon=True
+                    ).start()
+                return value
+        value = loader(key)
+        self._store(key, value)
+        return value
+
+    def _refresh(self, key: Any, loader: Callable[[Any], Any]) -> None:
+        try:
+            self._store(key, loader(key))
+        except Exception as e:
+            logger.debug(f"Cache refresh failed for {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _store(self, key: Any, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+class RobotsRules:
+    """Parsed robots.txt whose ``can_fetch`` answers are memoized.
+
+    Robots rules are plain path prefixes, so two URLs whose normalized paths
+    agree on the first ``prefix_length`` characters (the longest rule) always
+    get the same answer. Answers are memoized on that prefix.
+    """
+
+    def __init__(self, parser):
+        self.parser = parser
+        entries = list(parser.entries)
+        if parser.default_entry:
+            entries.append(parser.default_entry)
+        self.prefix_length = max(
+            (len(rule.path) for entry in entries for rule in entry.rulelines),
+            default=0,
+        )
+        self._memo: Dict[Tuple[str, str], bool] = {}
+
+    def can_fetch(self, user_agent: str, url: str) -> bool:
+        # Same normalization RobotFileParser.can_fetch applies
+        parsed = urlparse(unquote(url))
+        path = quote(urlunparse(('', '', parsed.path, parsed.params, parsed.query, parsed.fragment))) or '/'
+        key = (user_agent, path[:self.prefix_length])
+        allowed = self._memo.get(key)
+        if allowed is None:
+            allowed = self.parser.can_fetch(user_agent, url)
+            if len(self._memo) >= ROBOTS_MEMO_SIZE:
+                self._memo.clear()
+            self._memo[key] = allowed
+        return allowed
+
+def _load_robots(robots_url: str) -> RobotsRules:
+    from urllib.robotparser import RobotFileParser
+
+    parser = RobotFileParser(robots_url)
+    parser.read()
+    return RobotsRules(parser)
+
+# Shared by every crawler in the process, e.g. across API requests
+_ROBOTS_CACHE = TTLCache(ROBOTS_CACHE_SIZE, ROBOTS_CACHE_TTL)
+_DNS_CACHE = TTLCache(DNS_CACHE_SIZE, DNS_CACHE_TTL)
+_dns_install_lock = threading.Lock()
+_original_getaddrinfo: Optional[Callable[..., Any]] = None
+
+def get_robots_rules(robots_url: str) -> RobotsRules:
+    """Return cached robots.txt rules, downloading them on first use"""
+    return _ROBOTS_CACHE.get(robots_url, _load_robots)
+
+def install_dns_cache() -> None:
+    """Cache ``socket.getaddrinfo`` lookups process-wide.
+
+    Every connection pool resolves hosts through ``getaddrinfo``, so caching
+    it there covers requests, urllib and robots.txt downloads alike.
+    """
+    global _original_getaddrinfo
+    import socket
+
+    with _dns_install_lock:
+        if _original_getaddrinfo is not None:
+            return
+        original = _original_getaddrinfo = socket.getaddrinfo
+
+        def cached_getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+            key = (host, port, family, type, proto, flags)
+            return list(_DNS_CACHE.get(key, lambda args: original(*args)))
+
+        socket.getaddrinfo = cached_getaddrinfo
+
+def accept_encoding() -> str:
+    """Content codings urllib3 can decode here: gzip and deflate, plus br
+    and zstd when brotli or zstandard is installed"""
+    from urllib3.util.request import ACCEPT_ENCODING
+
+    return ', '.join(coding.strip() for coding in ACCEPT_ENCODING.split(','))
+
+def make_httpx_client(max_connections: int) -> httpx.Client:
+    """Shared httpx client for the ``httpx`` fetch backend.
+
+    HTTP/2 is used when the h2 package is installed, so concurrent requests
+    to a host share one connection. Otherwise the client speaks HTTP/1.1.
+    """
+    import importlib.util
+
+    try:
+        import httpx
+    except ImportError as e:
+        raise ValueError("The httpx fetch backend requires the httpx package") from e
+
+    http2 = importlib.util.find_spec('h2') is not None
+    if not http2:
+        logger.info("h2 is not installed, the httpx backend will use HTTP/1.1")
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    return httpx.Client(http2=http2, follow_redirects=True, limits=limits)
+
+def _requests_error(error: Exception) -> Exception:
+    """Map an httpx exception to its requests counterpart so retry and
+    error handling see the same types for both backends"""
+    import httpx
+    import requests
+
+    if isinstance(error, httpx.TimeoutException):
+        return requests.Timeout(str(error))
+    if isinstance(error, httpx.DecodingError):
+        return requests.exceptions.ContentDecodingError(str(error))
+    if isinstance(error, httpx.TransportError):
+        return requests.ConnectionError(str(error))
+    return requests.RequestException(str(error))
+
+class _HttpxBody:
+    """Streamed httpx response body in the shape ``requests.Response.raw`` expects"""
+
+    def __init__(self, response: httpx.Response):
+        self._response = response
+
+    def stream(self, chunk_size: int, decode_content: bool = True) -> Iterator[bytes]:
+        import httpx
+
+        try:
+            yield from self._response.iter_bytes(chunk_size)
+        except httpx.HTTPError as e:
+            raise _requests_error(e) from e
+
+    def tell(self) -> int:
+        # Bytes received before decoding, like urllib3's HTTPResponse.tell
+        return self._response.num_bytes_downloaded
+
+    def close(self) -> None:
+        self._response.close()
 
 class CrawlerStats:
     """Track crawler statistics"""
     def __init__(self):
         self.pages_visited: int = 0
+        self.pages_in_flight: int = 0
+        self.pages_deduplicated: int = 0
+        self.responses_aborted: int = 0
+        self.bytes_saved: int = 0
+        # Body bytes as received (possibly compressed) and after decoding
+        self.bytes_on_wire: int = 0
+        self.bytes_decoded: int = 0
+        # Pages served from the HTTP cache, and how many of those were revalidated
+        self.cache_hits: int = 0
+        self.cache_revalidated: int = 0
+        # Scripts and JSON fetched by the asset scan, and the bytes searched
+        self.assets_scanned: int = 0
+        self.asset_bytes: int = 0
         self.error_count: int = 0
+        self.retries: int = 0
         self.start_time: float = time.time()
-        self.error_log: List[str] = []
+        # Error counts by exception class and the most recent messages
+        self.error_counts: Dict[str, int] = defaultdict(int)
+        # Links skipped by each scope rule
+        self.pruned_by_rule: Dict[str, int] = defaultdict(int)
+        self.error_samples: deque = deque(maxlen=ERROR_SAMPLE_SIZE)
         self._lock = threading.Lock()
         self._last_print_time = 0
         self._last_pages = 0
@@ -86,10 +1163,61 @@ class CrawlerStats:
         with self._lock:
             self.pages_visited += 1
 
-    def add_error(self, error_msg: str) -> None:
+    def reserve_page(self, max_pages: int) -> bool:
+        """Claim one of the ``max_pages`` page slots before fetching a page"""
+        with self._lock:
+            if self.pages_visited + self.pages_in_flight >= max_pages:
+                return False
+            self.pages_in_flight += 1
+            return True
+
+    def release_page(self) -> None:
+        with self._lock:
+            self.pages_in_flight -= 1
+
+    def increment_deduplicated(self) -> None:
+        with self._lock:
+            self.pages_deduplicated += 1
+
+    def add_aborted(self, bytes_saved: int) -> None:
+        with self._lock:
+            self.responses_aborted += 1
+            self.bytes_saved += bytes_saved
+
+    def add_transfer(self, on_wire: int, decoded: int) -> None:
+        with self._lock:
+            self.bytes_on_wire += on_wire
+            self.bytes_decoded += decoded
+
+    def add_cache_hit(self, revalidated: bool) -> None:
+        with self._lock:
+            self.cache_hits += 1
+            self.cache_revalidated += revalidated
+
+    def increment_assets(self) -> None:
+        with self._lock:
+            self.assets_scanned += 1
+
+    def reserve_asset_bytes(self, size: int, budget: int) -> int:
+        """Take up to ``size`` bytes of the asset budget; returns the bytes granted"""
+        with self._lock:
+            granted = max(min(size, budget - self.asset_bytes), 0)
+            self.asset_bytes += granted
+            return granted
+
+    def add_pruned(self, rule: str) -> None:
+        with self._lock:
+            self.pruned_by_rule[rule] += 1
+
+    def add_error(self, error_msg: str, error_class: str = 'Error') -> None:
         with self._lock:
             self.error_count += 1
-            self.error_log.append(error_msg)
+            self.error_counts[error_class] += 1
+            self.error_samples.append(error_msg)
+
+    def increment_retries(self) -> None:
+        with self._lock:
+            self.retries += 1
 
     def get_elapsed_time(self) -> float:
         return time.time() - self.start_time
@@ -137,17 +1265,28 @@ def print_progress(
             pass
 
 class WebCrawler:
-    def __init__(self, config: CrawlerConfig):
+    def __init__(
+        self,
+        config: CrawlerConfig,
+        session: Optional[requests.Session] = None,
+        http_client: Optional[httpx.Client] = None,
+        index_results: bool = True,
+    ):
         self.config = config
+        # Optional shared session (or httpx client) so several crawlers can
+        # reuse one connection pool
+        self.session = session
         if config.verbose:
             logger.setLevel(logging.DEBUG)
         self.base_domain = urlparse(config.base_url).netloc
         self.visited_urls: Set[str] = set()
-        self.url_queue = Queue()
-        self.queued_urls: Set[str] = set()
+        self.url_queue = SpillingQueue(config.frontier_memory_limit, config.frontier_spill_dir)
+        # Digests of every URL queued in this crawl; a URL is claimed once, so
+        # no two workers fetch the same page. Digests keep this set small
+        # when the frontier itself has spilled to disk.
+        self._claimed = ShardedSet()
+        # Guards merging worker result buffers into the shared results
         self.results_lock = threading.Lock()
-        self.visited_lock = threading.Lock()
-        self.queue_lock = threading.Lock()
         # Lock to guard writes to the history file
         self._history_lock = threading.Lock()
         self.stats = CrawlerStats()
@@ -155,16 +1294,60 @@ class WebCrawler:
         self._last_save_count = 0
         self._stop_requested = False
         self.headers = DEFAULT_HEADERS.copy()
-        self._active_tasks = 0
-        self._active_lock = threading.Lock()
+        self.headers['Accept-Encoding'] = accept_encoding()
+        if config.fetch_backend not in FETCH_BACKENDS:
+            raise ValueError(f"Unknown fetch backend: {config.fetch_backend}")
+        # Used instead of requests (and ``session``) by the httpx backend.
+        # A client created here is closed by close() when the crawl ends.
+        self.http_client = None
+        self._owns_http_client = False
+        if config.fetch_backend == 'httpx':
+            self.http_client = http_client
+            if http_client is None:
+                self.http_client = make_httpx_client(config.max_workers)
+                self._owns_http_client = True
+        self.include_rules = UrlRules(config.include_rules) if config.include_rules else None
+        self.exclude_rules = UrlRules(config.exclude_rules) if config.exclude_rules else None
+        self.http_cache = None
+        if config.cache_dir:
+            from http_cache import HttpCache
+
+            self.http_cache = HttpCache(config.cache_dir, config.cache_max_bytes)
+        self.breaker = CircuitBreaker(config.breaker_threshold, config.breaker_cooldown)
+        # Failed URLs waiting to be queued again: heap of (due, seq, url, depth)
+        self._retry_heap: List[Tuple[float, int, str, int]] = []
+        self._retry_attempts: Dict[str, int] = {}
+        self._retry_lock = threading.Lock()
+        self._retry_sequence = itertools.count()
+        self.content_index = (
+            ContentIndex(config.near_duplicate_distance) if config.dedupe_content else None
+        )
+        # Duplicate page URL -> URL of the page whose results it shares
+        self.duplicate_pages: Dict[str, str] = {}
+        # Digests of assets already scanned (or being scanned) in this crawl
+        self._claimed_assets = ShardedSet()
+        # Digests of URLs pruned by the include/exclude rules, each counted once
+        self._pruned = ShardedSet()
+        # Unique matches for reports, filled in as pages are recorded. Callers
+        # that only serialize the results (the API) pass index_results=False.
+        self.result_index = ResultIndex(config.search_values) if index_results else None
+        # Time budget state for chunked crawls (see crawl_and_search)
+        self._deadline: Optional[float] = None
+        self._page_seconds = 0.0
+        self.budget_exhausted = False
+        # Digests of URLs visited by earlier chunks of a continued crawl
+        self._visited_digests: Set[bytes] = set()
+        self._resumed = False
         
-        # Initialize robots.txt parser
-        self.robots_parser = RobotFileParser() if config.respect_robots else None
+        if config.cache_dns:
+            install_dns_cache()
+
+        # Initialize robots.txt rules (cached across crawlers in this process)
+        self.robots_parser: Optional[RobotsRules] = None
         if config.respect_robots:
             try:
                 robots_url = urljoin(config.base_url, '/robots.txt')
-                self.robots_parser.set_url(robots_url)
-                self.robots_parser.read()
+                self.robots_parser = get_robots_rules(robots_url)
                 logger.info("Successfully loaded robots.txt")
             except Exception as e:
                 logger.warning(f"Could not load robots.txt: {e}")
@@ -211,13 +1394,125 @@ class WebCrawler:
             except Exception as e:
                 logger.error(f"Error saving history: {e}")
 
+    def is_visited(self, url: str) -> bool:
+        if url in self.visited_urls:
+            return True
+        return bool(self._visited_digests) and _url_digest(url) in self._visited_digests
+
+    def claim_url(self, url: str, depth: int) -> bool:
+        """Queue ``url`` unless it was already queued or visited.
+
+        The check and the insert are one atomic step on the URL's shard of
+        the claim set. Returns ``True`` if the URL was queued. A stopped
+        crawler takes no new URLs, except after a time budget stop, whose
+        queue is kept for the continuation token.
+        """
+        if self._stop_requested and not self.budget_exhausted:
+            return False
+        digest = _url_digest(url)
+        if url in self.visited_urls or digest in self._visited_digests:
+            return False
+        if not self._claimed.add(digest):
+            return False
+        self.url_queue.put((url, depth))
+        return True
+
+    def continuation_token(self) -> Optional[str]:
+        """Encode the remaining frontier so a later call can continue the crawl.
+
+        Returns ``None`` when there is nothing left to crawl. The token holds
+        the queued URLs, digests of every visited URL and the statistics.
+        """
+        frontier = [[url, depth] for url, depth in self.url_queue.snapshot()]
+        with self._retry_lock:
+            frontier.extend([url, depth] for _, _, url, depth in self._retry_heap)
+        if not frontier or self.stats.pages_visited >= self.config.max_pages:
+            return None
+        digests = self._visited_digests | {_url_digest(url) for url in self.visited_urls}
+        state = {
+            'v': CONTINUATION_VERSION,
+            'crawl': _crawl_fingerprint(self.config),
+            'frontier': frontier,
+            'visited': base64.b64encode(b''.join(sorted(digests))).decode('ascii'),
+            'found': sorted(self.found_values),
+            'stats': {
+                'pages_visited': self.stats.pages_visited,
+                'pages_deduplicated': self.stats.pages_deduplicated,
+                'error_count': self.stats.error_count,
+            },
+        }
+        payload = zlib.compress(json.dumps(state, separators=(',', ':')).encode('utf-8'))
+        return base64.urlsafe_b64encode(_token_mac(payload) + payload).decode('ascii')
+
+    def resume_from(self, token: str) -> None:
+        """Restore the state saved by :meth:`continuation_token`.
+
+        Raises ``ValueError`` if the token is malformed, was not signed with
+        this server's secret, inflates past ``MAX_TOKEN_BYTES`` or belongs to
+        a crawl with a different base URL or search values.
+        """
+        try:
+            raw = base64.urlsafe_b64decode(token.encode('ascii'))
+        except Exception as e:
+            raise ValueError(f"Invalid continuation token: {e}") from e
+        mac, payload = raw[:32], raw[32:]
+        if not hmac.compare_digest(mac, _token_mac(payload)):
+            raise ValueError("Invalid continuation token signature")
+        try:
+            inflater = zlib.decompressobj()
+            data = inflater.decompress(payload, MAX_TOKEN_BYTES)
+            if inflater.unconsumed_tail:
+                raise ValueError(f"larger than {MAX_TOKEN_BYTES} bytes")
+            state = json.loads(data)
+            visited = base64.b64decode(state['visited'])
+        except Exception as e:
+            raise ValueError(f"Invalid continuation token: {e}") from e
+        if state.get('v') != CONTINUATION_VERSION:
+            raise ValueError("Unsupported continuation token version")
+        if state.get('crawl') != _crawl_fingerprint(self.config):
+            raise ValueError("Continuation token belongs to a different crawl")
+
+        self._visited_digests = {visited[i:i + 8] for i in range(0, len(visited), 8)}
+        self.found_values.update(state.get('found', []))
+        stats = state.get('stats', {})
+        self.stats.pages_visited = stats.get('pages_visited', 0)
+        self.stats.pages_deduplicated = stats.get('pages_deduplicated', 0)
+        self.stats.error_count = stats.get('error_count', 0)
+        for url, depth in state.get('frontier', []):
+            # Only same-site URLs, so a crafted token can't redirect the crawler
+            if urlparse(url).netloc == self.base_domain:
+                self.claim_url(url, int(depth))
+        self._resumed = True
+
+    def _remaining_time(self) -> Optional[float]:
+        if self._deadline is None:
+            return None
+        return self._deadline - time.monotonic()
+
+    def _budget_allows_page(self) -> bool:
+        remaining = self._remaining_time()
+        return remaining is None or remaining > max(self._page_seconds, MIN_PAGE_BUDGET)
+
+    def _stop_for_budget(self) -> None:
+        """Stop claiming pages but keep the queue for the continuation token"""
+        if not self.budget_exhausted:
+            logger.info("Time budget nearly used. Stopping crawl...")
+        self.budget_exhausted = True
+        self._stop_requested = True
+
+    def _request_timeout(self) -> float:
+        remaining = self._remaining_time()
+        if remaining is None:
+            return self.config.timeout
+        return max(min(self.config.timeout, remaining - MIN_PAGE_BUDGET / 2), 0.1)
+
     def is_valid_url(self, url: str) -> bool:
         try:
             parsed = urlparse(url)
-            if any(url.lower().endswith(ext) for ext in SKIP_EXTENSIONS):
-                return False
             if parsed.netloc != self.base_domain:
                 return False
+            if parsed.path.lower().endswith(SKIP_SUFFIXES):
+                return False
             if self.robots_parser and not self.robots_parser.can_fetch(self.headers['User-Agent'], url):
                 if self.config.verbose:
                     logger.debug(f"Skipping blocked URL: {url}")
@@ -226,15 +1521,53 @@ class WebCrawler:
         except:
             return False
 
-    def get_links(self, soup: BeautifulSoup, current_url: str, current_depth: int) -> Dict[str, int]:
-        links = {}
+    def in_scope(self, url: str) -> bool:
+        """Apply the include/exclude rules, counting the URLs each rule prunes"""
+        if self.include_rules is None and self.exclude_rules is None:
+            return True
+        parsed = urlparse(url)
+        target = parsed.path or '/'
+        if parsed.query:
+            target = f"{target}?{parsed.query}"
+        if self.exclude_rules is not None:
+            rule = self.exclude_rules.match(target)
+            if rule is not None:
+                if self._pruned.add(_url_digest(url)):
+                    self.stats.add_pruned(f"exclude {rule}")
+                return False
+        if self.include_rules is not None and self.include_rules.match(target) is None:
+            if self._pruned.add(_url_digest(url)):
+                self.stats.add_pruned("not included")
+            return False
+        return True
+
+    def get_links(
+        self,
+        page: Union[BeautifulSoup, bytes, str],
+        current_url: str,
+        current_depth: int,
+        encoding: str = 'utf-8',
+    ) -> Dict[str, int]:
+        """Collect crawlable links from a page.
+
+        ``page`` is either raw HTML, which is scanned with
+        :func:`extract_links`, or an already parsed soup.
+        """
+        links: Dict[str, int] = {}
+        if current_depth >= self.config.max_depth:
+            return links
+        limit = self.config.max_links_per_page
         try:
-            for a_tag in soup.find_all('a', href=True):
-                if len(links) >= MAX_LINKS_PER_PAGE:
+            if isinstance(page, (bytes, str)):
+                urls = extract_links(page, current_url, encoding)
+            else:
+                urls = self._soup_links(page, current_url)
+            for url in urls:
+                if url in links or not self.is_valid_url(url) or not self.in_scope(url):
+                    continue
+                links[url] = current_depth + 1
+                if limit and len(links) >= limit:
                     break
-                url = urljoin(current_url, a_tag['href'])
-                if self.is_valid_url(url) and current_depth < self.config.max_depth:
-                    links[url] = current_depth + 1
         except Exception as e:
             if self.config.verbose:
                 logger.debug(
@@ -242,117 +1575,551 @@ class WebCrawler:
                 )
         return links
 
+    @staticmethod
+    def _soup_links(soup: BeautifulSoup, current_url: str) -> Iterator[str]:
+        base = soup.find('base', href=True)
+        base_url = urljoin(current_url, base['href']) if base else current_url
+        for a_tag in soup.find_all('a', href=True):
+            yield urldefrag(urljoin(base_url, a_tag['href'].strip()))[0]
+
     def make_request(self, url: str) -> Optional[requests.Response]:
-        """Make HTTP request with configured settings"""
+        """Make HTTP request with configured settings
+
+        The body is streamed so that non-HTML responses and responses larger
+        than ``max_body_bytes`` are dropped before they are downloaded.
+        Failures are recorded in ``stats`` and return ``None``.
+        """
+        try:
+            return self._fetch(url)
+        except Exception as e:
+            self._record_fetch_error(url, e)
+            return None
+
+    def _fetch(self, url: str) -> Optional[requests.Response]:
+        """Fetch ``url``, raising on failure.
+
+        Returns ``None`` for responses aborted by :meth:`_read_body`. Raises
+        :class:`CircuitOpenError` without a request if the host is paused.
+        With an HTTP cache, fresh entries are returned without a request and
+        stale ones are revalidated. Such responses have ``from_cache`` set.
+        """
+        cached = self.http_cache.get(url) if self.http_cache is not None else None
+        if cached is not None and cached.fresh:
+            self.stats.add_cache_hit(revalidated=False)
+            return self._cached_response(cached)
+        headers = self.headers if cached is None else {**self.headers, **cached.validators()}
+
+        host = urlparse(url).netloc
+        retry_after = self.breaker.retry_after(host)
+        if retry_after:
+            raise CircuitOpenError(host, retry_after)
+
+        response = None
+        try:
+            logger.debug(f"Requesting: {url}")
+            response = self._send(url, headers)
+            if cached is not None and response.status_code == 304:
+                response.close()
+                self.breaker.record_success(host)
+                self.http_cache.refresh(url, response.headers)
+                self.stats.add_cache_hit(revalidated=True)
+                return self._cached_response(cached)
+            response.raise_for_status()
+            if not self._read_body(url, response):
+                self.breaker.record_success(host)
+                return None
+        except Exception as e:
+            if response is not None:
+                response.close()
+            if is_retryable_error(e):
+                self.breaker.record_failure(host)
+            raise
+        self.breaker.record_success(host)
+        logger.debug(f"Request successful: {url}")
+        if self.http_cache is not None and response.status_code == 200:
+            self.http_cache.put(url, response.url or url, response.headers, response.content)
+        return response
+
+    def _send(self, url: str, headers: Dict[str, str]) -> requests.Response:
+        """Start a streamed GET with the configured fetch backend"""
+        import requests
+
+        if self.http_client is not None:
+            return self._httpx_get(url, headers)
+        get = self.session.get if self.session is not None else requests.get
+        return get(
+            url=url,
+            headers=headers,
+            timeout=self._request_timeout(),
+            verify=True,
+            stream=True,
+        )
+
+    def _cached_response(self, cached: CachedResponse) -> requests.Response:
+        import requests
+        from requests.structures import CaseInsensitiveDict
+        from requests.utils import get_encoding_from_headers
+
+        response = requests.Response()
+        response.status_code = 200
+        response.headers = CaseInsensitiveDict(cached.headers)
+        response.url = cached.url
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = cached.body
+        response._content_consumed = True
+        response.from_cache = True
+        return response
+
+    def _httpx_get(self, url: str, headers: Dict[str, str]) -> requests.Response:
+        """Start a streamed httpx request and wrap it in a requests.Response"""
+        import httpx
+        import requests
+        from requests.structures import CaseInsensitiveDict
+        from requests.utils import get_encoding_from_headers
+
+        try:
+            upstream = self.http_client.send(
+                self.http_client.build_request(
+                    'GET', url, headers=headers, timeout=self._request_timeout()
+                ),
+                stream=True,
+            )
+        except httpx.HTTPError as e:
+            raise _requests_error(e) from e
+
+        response = requests.Response()
+        response.status_code = upstream.status_code
+        response.reason = upstream.reason_phrase
+        response.headers = CaseInsensitiveDict(upstream.headers.items())
+        response.url = str(upstream.url)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = _HttpxBody(upstream)
+        return response
+
+    def _record_fetch_error(self, url: str, error: Exception) -> None:
+        if isinstance(error, CircuitOpenError):
+            logger.debug(f"Not fetching {url}: {error}")
+            return
+        logger.debug(f"Request failed: {url} - {str(error)}")
+        self.stats.add_error(f"Error fetching {url}: {str(error)}", type(error).__name__)
+
+    def retry_delay(self, url: str, error: Exception) -> Optional[float]:
+        """Seconds to wait before fetching ``url`` again after ``error``.
+
+        Returns ``None`` if the error is permanent or ``url`` has used up its
+        ``max_retries`` attempts.
+        """
+        held_back = isinstance(error, CircuitOpenError)
+        if not held_back and not is_retryable_error(error):
+            return None
+        attempt = self._retry_attempts.get(url, 0)
+        if attempt >= self.config.max_retries:
+            if held_back:
+                self.stats.add_error(f"Gave up on {url}: {error}", type(error).__name__)
+            return None
+        self._retry_attempts[url] = attempt + 1
+        if held_back:
+            return error.retry_after + random.uniform(0, min(self.config.breaker_cooldown, 1.0))
+        # Exponential backoff with jitter so retries don't arrive in bursts
+        delay = min(self.config.retry_backoff * 2 ** attempt, RETRY_BACKOFF_MAX)
+        delay *= random.uniform(0.5, 1.5)
+        self.stats.increment_retries()
+        logger.debug(f"Retrying {url} in {delay:.1f}s")
+        return delay
+
+    def _schedule_retry(self, url: str, depth: int, error: Exception) -> bool:
+        """Queue ``url`` again after a backoff delay if ``error`` is transient.
+
+        URLs held back by an open circuit breaker wait for the breaker. Each
+        wait uses up an attempt, so while a host stays down its queued URLs
+        are given up on after ``max_retries`` cooldowns instead of each
+        waiting for a trial request of its own. Returns ``True`` if a retry
+        was scheduled.
+        """
+        delay = self.retry_delay(url, error)
+        if delay is None:
+            return False
+        with self._retry_lock:
+            heapq.heappush(
+                self._retry_heap,
+                (time.monotonic() + delay, next(self._retry_sequence), url, depth),
+            )
+        return True
+
+    def release_due_retries(self) -> None:
+        """Move retries whose delay has passed back onto the URL queue"""
+        if not self._retry_heap or self._retry_heap[0][0] > time.monotonic():
+            return
+        with self._retry_lock:
+            while self._retry_heap and self._retry_heap[0][0] <= time.monotonic():
+                # Queue before popping so the crawl never looks finished in between
+                _, _, url, depth = self._retry_heap[0]
+                self.url_queue.put((url, depth))
+                heapq.heappop(self._retry_heap)
+
+    def pending_retries(self) -> int:
+        return len(self._retry_heap)
+
+    def _read_body(self, url: str, response: requests.Response) -> bool:
+        """Download a streamed body unless the headers or size rule it out"""
+        max_bytes = self.config.max_body_bytes
+        declared = response.headers.get('Content-Length', '')
+        declared_size = int(declared) if declared.isdigit() else 0
+
+        content_type = response.headers.get('Content-Type', '')
+        mime_type = content_type.split(';', 1)[0].strip().lower()
+        if mime_type and mime_type not in HTML_CONTENT_TYPES:
+            self._abort_response(url, response, f"content type {mime_type}", declared_size)
+            return False
+        if max_bytes and declared_size > max_bytes:
+            self._abort_response(url, response, f"{declared_size} bytes", declared_size)
+            return False
+
+        chunks = []
+        received = 0
+        for chunk in response.iter_content(chunk_size=BODY_CHUNK_SIZE):
+            received += len(chunk)
+            if max_bytes and received > max_bytes:
+                self._abort_response(
+                    url, response, f"more than {max_bytes} bytes",
+                    max(declared_size - received, 0),
+                )
+                return False
+            chunks.append(chunk)
+        response._content = b''.join(chunks)
+        tell = getattr(response.raw, 'tell', None)
+        self.stats.add_transfer(tell() if callable(tell) else received, received)
+        return True
+
+    def _abort_response(self, url: str, response: requests.Response, reason: str, bytes_saved: int) -> None:
+        logger.debug(f"Skipping {url}: {reason}")
+        response.close()
+        self.stats.add_aborted(bytes_saved)
+        # Remember the URL so other pages linking to it don't trigger a refetch
+        self.visited_urls.add(url)
+
+    def close(self) -> None:
+        """Release the httpx client this crawler created, if any"""
+        if self._owns_http_client and self.http_client is not None:
+            self.http_client.close()
+
+    def stop(self) -> None:
+        self._stop_requested = True
+        with self._retry_lock:
+            self._retry_heap.clear()
+        self.url_queue.clear()
+
+    def active_task_count(self) -> int:
+        # Every queued URL stays unfinished until its page has been recorded
+        return max(self.url_queue.unfinished_tasks - self.url_queue.qsize(), 0)
+
+    def merge_results(
+        self,
+        local_results: Dict[str, List[MatchRecord]],
+        results: Dict[str, List[MatchRecord]],
+    ) -> None:
+        """Merge a worker's result buffer into the shared results"""
+        with self.results_lock:
+            for key, records in local_results.items():
+                results.setdefault(key, []).extend(records)
+
+    def worker(self, searches: List[Tuple[str, str]], results: Dict[str, List[MatchRecord]]) -> None:
+        """Worker function for concurrent crawling
+
+        Matches are collected in a buffer owned by this worker and merged
+        into ``results`` once, when the worker exits.
+        """
+        local_results: Dict[str, List[MatchRecord]] = defaultdict(list)
+        try:
+            while not self._stop_requested:
+                try:
+                    if not self._budget_allows_page():
+                        self._stop_for_budget()
+                        break
+
+                    self.release_due_retries()
+
+                    # Reserve a page slot before taking a URL off the queue
+                    if not self.stats.reserve_page(self.config.max_pages):
+                        if self.stats.pages_visited >= self.config.max_pages:
+                            logger.info(
+                                f"Reached maximum pages limit ({self.config.max_pages})"
+                            )
+                            self.stop()
+                            break
+                        # A page in flight may still fail and free its slot
+                        time.sleep(0.05)
+                        continue
+
+                    # Get URL from queue with timeout
+                    remaining = self._remaining_time()
+                    wait = 1 if remaining is None else max(min(1, remaining - MIN_PAGE_BUDGET), 0.01)
+                    try:
+                        current_url, current_depth = self.url_queue.get(timeout=wait)
+                    except Empty:
+                        self.stats.release_page()
+                        continue
+
+                    started = time.monotonic()
+                    try:
+                        fetched = self.process_url(current_url, current_depth, searches, local_results)
+                    finally:
+                        self.stats.release_page()
+                        self.url_queue.task_done()
+
+                    if fetched:
+                        # Moving average of page time, used to stop before the deadline
+                        elapsed = time.monotonic() - started + self.config.sleep_time
+                        self._page_seconds = 0.7 * self._page_seconds + 0.3 * elapsed
+                        remaining = self._remaining_time()
+                        time.sleep(
+                            self.config.sleep_time if remaining is None
+                            else max(min(self.config.sleep_time, remaining), 0)
+                        )
+
+                except Exception as e:
+                    logger.error(f"Error in worker: {str(e)}")
+                    continue
+        finally:
+            self.merge_results(local_results, results)
+
+    def process_url(
+        self,
+        current_url: str,
+        current_depth: int,
+        searches: List[Tuple[str, str]],
+        results: Dict[str, List[MatchRecord]],
+    ) -> bool:
+        """Fetch, search and record a single page.
+
+        Returns ``True`` when a request was made so callers can apply their
+        politeness delay. Transient failures are queued again after a
+        backoff delay.
+        """
+        if self.is_visited(current_url):
+            return False
+
+        logger.info(f"Processing: {current_url}")
+        try:
+            response = self._fetch(current_url)
+        except Exception as e:
+            self._record_fetch_error(current_url, e)
+            self._schedule_retry(current_url, current_depth, e)
+            return not isinstance(e, CircuitOpenError)
+        if response is not None:
+            page = self.build_page(current_url, current_depth, response, searches)
+            self.record_page(page, searches, results)
+            # Pages from the HTTP cache put no load on the site
+            return not getattr(response, 'from_cache', False)
+        return True
+
+    def crawl_page(self, url: str, depth: int, searches: List[Tuple[str, str]]) -> Optional[PageResult]:
+        """Fetch and search a page without touching shared crawl state.
+
+        Re-raises :class:`CircuitOpenError` and transient fetch errors so the
+        caller can try the URL again later. Other failures and aborted
+        responses return ``None``.
+        """
         try:
-            logger.debug(f"Requesting: {url}")
-            response = requests.get(
-                url=url,
-                headers=self.headers,
-                timeout=self.config.timeout,
-                verify=True
-            )
-            response.raise_for_status()
-            logger.debug(f"Request successful: {url}")
-            return response
+            response = self._fetch(url)
         except Exception as e:
-            logger.debug(f"Request failed: {url} - {str(e)}")
-            self.stats.add_error(f"Error fetching {url}: {str(e)}")
+            self._record_fetch_error(url, e)
+            if isinstance(e, CircuitOpenError) or is_retryable_error(e):
+                raise
+            return None
+        if response is None:
             return None
+        return self.build_page(url, depth, response, searches)
 
-    def stop(self) -> None:
-        self._stop_requested = True
-        while not self.url_queue.empty():
+    def build_page(
+        self,
+        url: str,
+        depth: int,
+        response: requests.Response,
+        searches: List[Tuple[str, str]],
+    ) -> PageResult:
+        """Search a fetched page and collect its links"""
+        from bs4 import BeautifulSoup
+
+        digest = None
+        if self.content_index is not None:
+            digest = hashlib.blake2b(response.content, digest_size=16).digest()
+            original = self.content_index.find_exact(digest)
+            if original is not None:
+                return self._reuse_page(url, depth, original)
+
+        soup = BeautifulSoup(response.text, 'html.parser')
+
+        fingerprint = None
+        counts: Tuple[int, ...] = ()
+        if self.content_index is not None and self.content_index.max_distance > 0:
+            patterns = raw_value_patterns(tuple(searches))
+            if patterns is not None:
+                fingerprint = simhash(soup.get_text(' '))
+                counts = raw_value_counts(response.text, patterns)
+                original = self.content_index.find_near(fingerprint, counts)
+                if original is not None:
+                    return self._reuse_page(url, depth, original)
+
+        found = self.search_page(soup, searches)
+        # Visibility is computed once per page, and only if something matched
+        hidden_index = build_visibility_index(soup) if any(found.values()) else {}
+        matches = {
+            key: [
+                MatchRecord(url, element, lookup_hidden_reason(element, hidden_index))
+                for element in elements
+            ]
+            for key, elements in found.items()
+        }
+        encoding = response.encoding or 'utf-8'
+        if self.config.scan_assets:
+            matches.update(
+                self.scan_assets(response.content, response.url or url, searches, encoding)
+            )
+
+        # Only collect new links if we haven't reached the page limit
+        links: Dict[str, int] = {}
+        if self.stats.pages_visited < self.config.max_pages and depth < self.config.max_depth:
+            links = self.get_links(response.content, response.url or url, depth, encoding)
+        page = PageResult(url=url, depth=depth, matches=matches, links=links)
+        if self.content_index is not None:
+            self.content_index.add(digest, fingerprint, page, counts)
+        return page
+
+    def scan_assets(
+        self,
+        html: bytes,
+        page_url: str,
+        searches: List[Tuple[str, str]],
+        encoding: str = 'utf-8',
+    ) -> Dict[str, List[MatchRecord]]:
+        """Search a page's inline JSON and the scripts and JSON it references.
+
+        Each same-origin asset is fetched once per crawl, however many pages
+        reference it, and streamed through an :class:`AssetMatcher` without
+        building a DOM. Fetching stops once ``asset_byte_budget`` bytes have
+        been scanned. Matches are keyed by :func:`asset_key`. ``encoding`` is
+        the page's, used for inline JSON and asset URLs.
+        """
+        from bs4 import NavigableString
+
+        matcher = asset_matcher(tuple(searches))
+        matches: Dict[str, List[MatchRecord]] = {}
+        if not matcher.patterns:
+            return matches
+
+        def add(url: str, found: Dict[str, List[str]]) -> None:
+            for key, snippets in found.items():
+                matches.setdefault(key, []).extend(
+                    MatchRecord(url, NavigableString(snippet), ASSET_HIDDEN_REASON)
+                    for snippet in snippets
+                )
+
+        urls, inline_json = extract_assets(html, page_url, encoding)
+        for body in inline_json:
+            add(page_url, matcher.scan([body.decode(encoding, errors='replace')]))
+
+        for url in urls:
+            if self._stop_requested or self.stats.asset_bytes >= self.config.asset_byte_budget:
+                break
+            if urlparse(url).netloc != self.base_domain:
+                continue
+            if self.robots_parser and not self.robots_parser.can_fetch(self.headers['User-Agent'], url):
+                continue
+            if not self._claimed_assets.add(_url_digest(url)):
+                continue
             try:
-                url, _ = self.url_queue.get_nowait()
-                with self.queue_lock:
-                    self.queued_urls.discard(url)
-            except:
-                pass
+                add(url, matcher.scan(self._stream_asset(url)))
+            except Exception as e:
+                logger.debug(f"Asset scan failed: {url} - {str(e)}")
+        return matches
 
-    def active_task_count(self) -> int:
-        with self._active_lock:
-            return self._active_tasks
+    def _stream_asset(self, url: str) -> Iterator[str]:
+        """Yield the decoded text of a script or JSON asset chunk by chunk"""
+        host = urlparse(url).netloc
+        retry_after = self.breaker.retry_after(host)
+        if retry_after:
+            raise CircuitOpenError(host, retry_after)
 
-    def worker(self, searches: List[Tuple[str, str]], results: Dict[str, List[Tuple[str, Any]]]) -> None:
-        """Worker function for concurrent crawling"""
-        while not self._stop_requested:
+        logger.debug(f"Scanning asset: {url}")
+        response = self._send(url, self.headers)
+        try:
+            response.raise_for_status()
+            content_type = response.headers.get('Content-Type', '').lower()
+            if content_type and not any(kind in content_type for kind in ASSET_CONTENT_TYPES):
+                logger.debug(f"Skipping asset {url}: content type {content_type}")
+                return
+            self.stats.increment_assets()
             try:
-                # Check page limit before processing new URLs
-                with self.visited_lock:
-                    if self.stats.pages_visited >= self.config.max_pages:
-                        logger.info(
-                            f"Reached maximum pages limit ({self.config.max_pages})"
-                        )
-                        self.stop()
-                        break
+                decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+            except LookupError:
+                decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            for chunk in response.iter_content(chunk_size=BODY_CHUNK_SIZE):
+                granted = self.stats.reserve_asset_bytes(len(chunk), self.config.asset_byte_budget)
+                yield decoder.decode(chunk[:granted])
+                if granted < len(chunk):
+                    logger.debug(f"Asset byte budget reached while scanning {url}")
+                    break
+            yield decoder.decode(b'', final=True)
+        finally:
+            response.close()
+        time.sleep(self.config.sleep_time)
 
-                # Get URL from queue with timeout
-                try:
-                    current_url, current_depth = self.url_queue.get(timeout=1)
-                    with self.queue_lock:
-                        self.queued_urls.discard(current_url)
-                except:
-                    continue
+    def _reuse_page(self, url: str, depth: int, original: PageResult) -> PageResult:
+        """Build the result for a duplicate page from the page it duplicates"""
+        logger.debug(f"Duplicate of {original.url}, skipping search: {url}")
+        self.stats.increment_deduplicated()
+        links: Dict[str, int] = {}
+        if depth < self.config.max_depth:
+            links = {link: depth + 1 for link in original.links}
+        return PageResult(
+            url=url,
+            depth=depth,
+            matches=original.matches,
+            links=links,
+            duplicate_of=original.url,
+        )
 
-                with self._active_lock:
-                    self._active_tasks += 1
+    def record_page(
+        self,
+        page: PageResult,
+        searches: List[Tuple[str, str]],
+        results: Dict[str, List[MatchRecord]],
+    ) -> None:
+        """Merge a crawled page into the results, queue and visited set
 
-                if current_url in self.visited_urls:
-                    with self._active_lock:
-                        self._active_tasks -= 1
-                    continue
+        Duplicate pages don't add their matches again; they are listed in
+        ``duplicate_pages`` instead. ``results`` is not locked here, so
+        concurrent callers pass their own buffer (see :meth:`worker`).
+        """
+        if page.duplicate_of:
+            self.duplicate_pages[page.url] = page.duplicate_of
 
-                logger.info(f"Processing: {current_url}")
+        for search_type, value in searches:
+            for key in self.result_keys(search_type, value):
+                records = results.setdefault(key, [])
+                if page.matches.get(key) and not page.duplicate_of:
+                    records.extend(page.matches[key])
+                    if self.result_index is not None:
+                        self.result_index.add(key, page.matches[key])
+                    found = found_value_for(search_type, value)
+                    if found:
+                        self.found_values.add(found)
+                        logger.info(f"Found value: '{found}'")
 
-                response = self.make_request(current_url)
-                if not response:
-                    with self._active_lock:
-                        self._active_tasks -= 1
-                    continue
+        for url, depth in page.links.items():
+            self.claim_url(url, depth)
 
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Process search results
-                page_results = self.search_page(soup, searches)
-                with self.results_lock:
-                    for search_type, value in searches:
-                        key = f"{search_type}:{value}"
-                        if key not in results:
-                            results[key] = []
-                        if page_results.get(key):
-                            results[key].extend((current_url, element) for element in page_results[key])
-                            if search_type == 'text':
-                                self.found_values.add(value)
-                                logger.info(f"Found value: '{value}'")
-                                self.save_history()
-
-                # Only add new links if we haven't reached the page limit
-                if self.stats.pages_visited < self.config.max_pages:
-                    if current_depth < self.config.max_depth:
-                        new_links = self.get_links(soup, current_url, current_depth)
-                        for url, depth in new_links.items():
-                            with self.queue_lock:
-                                if url not in self.visited_urls and url not in self.queued_urls:
-                                    self.url_queue.put((url, depth))
-                                    self.queued_urls.add(url)
-
-                # Mark URL as visited
-                with self.visited_lock:
-                    self.visited_urls.add(current_url)
-                    self.stats.increment_pages()
-
-                with self._active_lock:
-                    self._active_tasks -= 1
-
-                time.sleep(self.config.sleep_time)
+        # Mark URL as visited
+        self.visited_urls.add(page.url)
+        self.stats.increment_pages()
 
-            except Exception as e:
-                logger.error(f"Error in worker: {str(e)}")
-                with self._active_lock:
-                    if self._active_tasks > 0:
-                        self._active_tasks -= 1
-                continue
+    def result_keys(self, search_type: str, value: str) -> List[str]:
+        """Keys a search stores its matches under in this crawl"""
+        keys = [f"{search_type}:{value}"]
+        if self.config.scan_assets and asset_key(search_type, value):
+            keys.append(asset_key(search_type, value))
+        return keys
 
     def search_page(self, soup: BeautifulSoup, searches: List[Tuple[str, str]]) -> Dict[str, List[Any]]:
         results = defaultdict(list)
@@ -365,30 +2132,50 @@ class WebCrawler:
         self,
         searches: List[Tuple[str, str]],
         on_progress: Optional[Callable[[int, int], None]] = None,
-    ) -> Dict[str, List[Tuple[str, Any]]]:
-        """Crawl pages and perform searches"""
+        deadline: Optional[float] = None,
+    ) -> Dict[str, List[MatchRecord]]:
+        """Crawl pages and perform searches
+
+        ``deadline`` is a :func:`time.monotonic` timestamp. When given, the
+        crawl stops claiming pages shortly before it, leaving the rest of the
+        queue for :meth:`continuation_token`. The crawler's own httpx client
+        is closed when the crawl ends.
+        """
+        try:
+            return self._crawl_and_search(searches, on_progress, deadline)
+        finally:
+            self.close()
+
+    def _crawl_and_search(
+        self,
+        searches: List[Tuple[str, str]],
+        on_progress: Optional[Callable[[int, int], None]],
+        deadline: Optional[float],
+    ) -> Dict[str, List[MatchRecord]]:
+        import concurrent.futures
+
         results = defaultdict(list)
+        self._deadline = deadline
         
         logger.info("Starting crawl...")
         logger.info("Press Ctrl+C to stop at any time")
         
-        # Test initial connection
-        try:
-            logger.info(f"Testing connection to {self.config.base_url}...")
-            response = self.make_request(self.config.base_url)
-            if not response:
-                logger.error("Failed to connect to the base URL. Please check the URL and try again.")
+        # Test initial connection (a continued crawl has already reached the site)
+        if not self._resumed:
+            try:
+                logger.info(f"Testing connection to {self.config.base_url}...")
+                response = self.make_request(self.config.base_url)
+                if not response:
+                    logger.error("Failed to connect to the base URL. Please check the URL and try again.")
+                    return results
+                logger.info("Successfully connected to base URL")
+            except Exception as e:
+                logger.error(f"Error connecting to base URL: {str(e)}")
                 return results
-            logger.info("Successfully connected to base URL")
-        except Exception as e:
-            logger.error(f"Error connecting to base URL: {str(e)}")
-            return results
 
         # Initialize URL queue with base URL
-        with self.queue_lock:
-            if self.config.base_url not in self.visited_urls and self.config.base_url not in self.queued_urls:
-                self.url_queue.put((self.config.base_url, 0))
-                self.queued_urls.add(self.config.base_url)
+        self.claim_url(self.config.base_url, 0)
+        last_history_save = time.monotonic()
         
         try:
             # Create and start worker threads
@@ -417,12 +2204,24 @@ class WebCrawler:
                             end='',
                         )
 
-                        if current_queue_size == 0 and active_tasks == 0:
+                        # Links are queued before their page is marked done,
+                        # so this only reaches zero once the crawl is over
+                        if self.url_queue.unfinished_tasks == 0 and not self.pending_retries():
                             logger.info("Queue empty and no pages in progress. Stopping crawl...")
                             self.stop()
                             break
+
+                        # History is written here rather than by the workers
+                        if time.monotonic() - last_history_save >= HISTORY_SAVE_INTERVAL:
+                            self.save_history()
+                            last_history_save = time.monotonic()
                         
-                        time.sleep(1)  # Reduced sleep time for more responsive monitoring
+                        remaining = self._remaining_time()
+                        if remaining is not None and remaining <= MIN_PAGE_BUDGET / 2:
+                            self._stop_for_budget()
+                            break
+                        # Reduced sleep time for more responsive monitoring
+                        time.sleep(1 if remaining is None else max(min(1, remaining - MIN_PAGE_BUDGET / 2), 0.01))
                         
                     except KeyboardInterrupt:
                         logger.info("Ctrl+C detected. Stopping crawl...")
@@ -436,7 +2235,45 @@ class WebCrawler:
                         future.result(timeout=1)
                     except:
                         pass
-            
+
+            self.save_history()
+            if self.stats.error_counts:
+                summary = ', '.join(
+                    f"{name}: {count}" for name, count in sorted(self.stats.error_counts.items())
+                )
+                logger.info(f"Fetch errors by type: {summary} ({self.stats.retries} retried)")
+            if self.stats.pages_deduplicated:
+                logger.info(
+                    f"Skipped searching {self.stats.pages_deduplicated} duplicate page(s)"
+                )
+            if self.stats.responses_aborted:
+                logger.info(
+                    f"Aborted {self.stats.responses_aborted} non-HTML or oversized "
+                    f"response(s), saving at least {self.stats.bytes_saved} bytes"
+                )
+            if self.stats.pruned_by_rule:
+                logger.info("Links pruned by scope rules:")
+                for rule, count in sorted(self.stats.pruned_by_rule.items(), key=lambda item: -item[1]):
+                    logger.info(f"  {rule}: {count}")
+            if self.stats.cache_hits:
+                logger.info(
+                    f"Served {self.stats.cache_hits} page(s) from the HTTP cache "
+                    f"({self.stats.cache_revalidated} revalidated)"
+                )
+            if self.stats.assets_scanned:
+                budget_note = (
+                    " (byte budget reached)"
+                    if self.stats.asset_bytes >= self.config.asset_byte_budget else ""
+                )
+                logger.info(
+                    f"Scanned {self.stats.assets_scanned} script/JSON asset(s), "
+                    f"{self.stats.asset_bytes} bytes{budget_note}"
+                )
+            if self.stats.bytes_decoded:
+                logger.info(
+                    f"Downloaded {self.stats.bytes_on_wire} bytes, "
+                    f"{self.stats.bytes_decoded} bytes after decoding"
+                )
             return dict(results)
             
         except Exception as e:
@@ -444,37 +2281,292 @@ class WebCrawler:
             self.save_history()
             return dict(results)
 
-def is_hidden(element: Tag) -> bool:
-    """Check if an element is hidden"""
-    if not isinstance(element, Tag):
-        return False
-        
-    return (
-        element.get('type') == 'hidden' or
-        element.get('style', '').find('display: none') >= 0 or
-        element.get('style', '').find('visibility: hidden') >= 0 or
-        'hidden' in element.get('class', []) or
-        element.get('aria-hidden') == 'true'
-    )
+class BatchCrawler:
+    """Crawl several sites over one shared pool of fetch workers.
 
-def get_hidden_reason(element: Tag) -> str:
-    """Determine why an element is hidden"""
+    Every site keeps its own :class:`WebCrawler` state (queue, visited set,
+    statistics) while the workers share one HTTP session, or one httpx
+    client for sites using the httpx backend. Sites are served
+    round-robin and a host is not fetched again until its ``sleep_time`` has
+    passed, so slow sites do not hold back the fast ones.
+    """
+
+    def __init__(
+        self,
+        configs: List[CrawlerConfig],
+        max_workers: Optional[int] = None,
+        index_results: bool = True,
+    ):
+        if not configs:
+            raise ValueError("At least one site is required")
+        import concurrent.futures
+
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.max_workers = max_workers or max(config.max_workers for config in configs)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(configs), pool_maxsize=self.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.http_client = None
+        if any(config.fetch_backend == 'httpx' for config in configs):
+            self.http_client = make_httpx_client(self.max_workers)
+
+        # Loading robots.txt is blocking, so set the sites up in parallel
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            self.crawlers: List[WebCrawler] = list(executor.map(
+                lambda config: WebCrawler(
+                    config,
+                    session=self.session,
+                    http_client=self.http_client,
+                    index_results=index_results,
+                ),
+                configs,
+            ))
+
+        self._lock = threading.Lock()
+        self._next_fetch: Dict[str, float] = {}
+        self._cursor = 0
+        self._active = 0
+        self._stop_requested = False
+
+    def stop(self) -> None:
+        self._stop_requested = True
+        for crawler in self.crawlers:
+            crawler.stop()
+
+    def close(self) -> None:
+        """Close the shared session and httpx client"""
+        self.session.close()
+        if self.http_client is not None:
+            self.http_client.close()
+
+    def _claim(self) -> Optional[Tuple[WebCrawler, str, int]]:
+        """Pick the next URL, rotating over sites whose host is ready"""
+        with self._lock:
+            now = time.monotonic()
+            count = len(self.crawlers)
+            for offset in range(count):
+                index = (self._cursor + offset) % count
+                crawler = self.crawlers[index]
+                if crawler._stop_requested:
+                    continue
+                if self._next_fetch.get(crawler.base_domain, 0) > now:
+                    continue
+                # Pages in flight count against max_pages too; the worker
+                # releases the slot once the page is done
+                if not crawler.stats.reserve_page(crawler.config.max_pages):
+                    if crawler.stats.pages_visited >= crawler.config.max_pages:
+                        logger.info(
+                            f"Reached maximum pages limit for {crawler.config.base_url}"
+                        )
+                        crawler.stop()
+                    continue
+                crawler.release_due_retries()
+                try:
+                    url, depth = crawler.url_queue.get_nowait()
+                except Empty:
+                    crawler.stats.release_page()
+                    continue
+                self._next_fetch[crawler.base_domain] = now + crawler.config.sleep_time
+                self._cursor = index + 1
+                self._active += 1
+                return crawler, url, depth
+            return None
+
+    def _is_finished(self) -> bool:
+        with self._lock:
+            return self._active == 0 and all(
+                crawler._stop_requested
+                or (crawler.url_queue.empty() and not crawler.pending_retries())
+                for crawler in self.crawlers
+            )
+
+    def _worker(
+        self,
+        searches: List[Tuple[str, str]],
+        results: Dict[str, Dict[str, List[MatchRecord]]],
+    ) -> None:
+        # Per-site result buffers owned by this worker, merged when it exits
+        buffers: Dict[WebCrawler, Dict[str, List[MatchRecord]]] = defaultdict(
+            lambda: defaultdict(list)
+        )
+        try:
+            while not self._stop_requested:
+                claim = self._claim()
+                if claim is None:
+                    if self._is_finished():
+                        break
+                    time.sleep(0.05)
+                    continue
+
+                crawler, url, depth = claim
+                try:
+                    crawler.process_url(url, depth, searches, buffers[crawler])
+                except Exception as e:
+                    logger.error(f"Error in batch worker: {str(e)}")
+                finally:
+                    crawler.stats.release_page()
+                    crawler.url_queue.task_done()
+                    with self._lock:
+                        self._active -= 1
+        finally:
+            for crawler, buffer in buffers.items():
+                crawler.merge_results(buffer, results[crawler.config.base_url])
+
+    def crawl_and_search(
+        self, searches: List[Tuple[str, str]]
+    ) -> Dict[str, Dict[str, List[MatchRecord]]]:
+        """Crawl every site and return raw results keyed by base URL"""
+        import concurrent.futures
+
+        results: Dict[str, Dict[str, List[MatchRecord]]] = {}
+        for crawler in self.crawlers:
+            base_url = crawler.config.base_url
+            results[base_url] = defaultdict(list)
+            crawler.claim_url(base_url, 0)
+
+        logger.info(
+            f"Starting batch crawl of {len(self.crawlers)} sites with {self.max_workers} workers..."
+        )
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [
+                    executor.submit(self._worker, searches, results)
+                    for _ in range(self.max_workers)
+                ]
+                try:
+                    concurrent.futures.wait(futures)
+                except KeyboardInterrupt:
+                    logger.info("Ctrl+C detected. Stopping batch crawl...")
+                    self.stop()
+        finally:
+            self.close()
+
+        for crawler in self.crawlers:
+            crawler.save_history()
+        return {base_url: dict(site_results) for base_url, site_results in results.items()}
+
+def _normalize_style(style: str) -> str:
+    return re.sub(r'\s+', '', style).lower()
+
+def _own_hidden_reasons(element: Tag) -> List[str]:
+    """Reasons an element hides itself, ignoring its ancestors"""
     reasons = []
     if element.get('type') == 'hidden':
         reasons.append('Hidden input field')
-    if element.get('style', '').find('display: none') >= 0:
+    style = _normalize_style(element.get('style', ''))
+    if 'display:none' in style:
         reasons.append('CSS display:none')
-    if element.get('style', '').find('visibility: hidden') >= 0:
-        reasons.append('CSS visibility:hidden')
-    if 'hidden' in element.get('class', []):
+    if 'visibility:hidden' in style or 'visibility:collapse' in style:
+        reasons.append(VISIBILITY_HIDDEN_REASON)
+    if element.has_attr('hidden'):
+        reasons.append('HTML hidden attribute')
+    classes = element.get('class', [])
+    if isinstance(classes, str):
+        classes = classes.split()
+    if HIDDEN_CLASSES.intersection(classes):
         reasons.append('Hidden class')
     if element.get('aria-hidden') == 'true':
         reasons.append('ARIA hidden')
+    if element.name in NON_RENDERED_TAGS:
+        reasons.append(f'Non-rendered <{element.name}> content')
+    return reasons
+
+def _visibility_step(
+    tag: Tag, inherited: Optional[str], inherited_visibility: Optional[str]
+) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """Apply one tag to the hidden state inherited from its ancestors.
+
+    Returns the tag's own hidden reason (``None`` if visible) and the display
+    and visibility state its children inherit. ``visibility:hidden`` is kept
+    separately because a descendant can undo it with ``visibility:visible``.
+    """
+    own = _own_hidden_reasons(tag)
+    visibility = inherited_visibility
+    child_visibility = inherited_visibility
+    if VISIBILITY_HIDDEN_REASON in own:
+        own.remove(VISIBILITY_HIDDEN_REASON)
+        visibility = VISIBILITY_HIDDEN_REASON
+        child_visibility = f"Inside hidden <{tag.name}>: {VISIBILITY_HIDDEN_REASON}"
+    elif 'visibility:visible' in _normalize_style(tag.get('style', '')):
+        visibility = child_visibility = None
+
+    reasons = own + [reason for reason in (visibility, inherited) if reason]
+    child_inherited = inherited
+    if own and not inherited:
+        child_inherited = f"Inside hidden <{tag.name}>: {' and '.join(own)}"
+    return (' and '.join(reasons) or None), child_inherited, child_visibility
+
+def build_visibility_index(soup: BeautifulSoup) -> Dict[int, str]:
+    """Compute the hidden reason of every hidden tag in one top-down pass.
+
+    The result maps ``id(tag)`` to the reason the tag is hidden, including
+    state inherited from hidden ancestors. Visible tags are not listed. Look
+    entries up with :func:`lookup_hidden_reason` while the soup is alive.
+    """
+    from bs4 import Tag
+
+    hidden: Dict[int, str] = {}
+    stack: List[Tuple[Tag, Optional[str], Optional[str]]] = [(soup, None, None)]
+    while stack:
+        tag, inherited, inherited_visibility = stack.pop()
+        reason, child_inherited, child_visibility = _visibility_step(
+            tag, inherited, inherited_visibility
+        )
+        if reason:
+            hidden[id(tag)] = reason
+        for child in tag.children:
+            if isinstance(child, Tag):
+                stack.append((child, child_inherited, child_visibility))
+    return hidden
+
+def lookup_hidden_reason(element: Union[Tag, NavigableString], index: Dict[int, str]) -> Optional[str]:
+    """Hidden reason of a tag or text node from a :func:`build_visibility_index` result"""
+    # Text nodes are str subclasses
+    if isinstance(element, str):
+        element = element.parent
+    if element is None:
+        return None
+    return index.get(id(element))
+
+def get_inherited_hidden_reason(element: Union[Tag, NavigableString]) -> Optional[str]:
+    """Hidden reason of a single element, walking its ancestors.
+
+    Use :func:`build_visibility_index` instead when checking many elements of
+    the same page.
+    """
+    from bs4 import NavigableString
+
+    tag = element.parent if isinstance(element, NavigableString) else element
+    if tag is None:
+        return None
+    chain = [tag] + [parent for parent in tag.parents if parent is not None]
+    reason, inherited, visibility = None, None, None
+    for ancestor in reversed(chain):
+        reason, inherited, visibility = _visibility_step(ancestor, inherited, visibility)
+    return reason
+
+def is_hidden(element: Tag) -> bool:
+    """Check if an element hides itself (see :func:`get_inherited_hidden_reason`)"""
+    from bs4 import Tag
+
+    if not isinstance(element, Tag):
+        return False
+    return bool(_own_hidden_reasons(element))
+
+def get_hidden_reason(element: Tag) -> str:
+    """Determine why an element hides itself"""
+    reasons = _own_hidden_reasons(element)
     return ' and '.join(reasons) if reasons else 'Unknown'
 
 def search_html(soup: BeautifulSoup, search_type: str, value: str) -> List[Any]:
     """
     Enhanced search function that finds both visible and hidden elements
+
+    ``regex`` and ``css`` searches reuse the patterns compiled by
+    :func:`build_searches`.
     """
     matches = []
     
@@ -535,13 +2627,31 @@ def search_html(soup: BeautifulSoup, search_type: str, value: str) -> List[Any]:
                     if isinstance(attr_value, str) and value.lower() in attr_value.lower():
                         matches.append(tag)
                         break
+
+    elif search_type == 'regex':
+        pattern = compile_regex(value)
+        # Text nodes (including script contents) matching the pattern
+        matches.extend(soup.find_all(string=pattern))
+
+        # Elements with an attribute value matching the pattern
+        for tag in soup.find_all(True):
+            for attr_value in tag.attrs.values():
+                if isinstance(attr_value, list):
+                    attr_value = ' '.join(attr_value)
+                if isinstance(attr_value, str) and pattern.search(attr_value):
+                    matches.append(tag)
+                    break
+
+    elif search_type == 'css':
+        matches.extend(compile_css(value).select(soup))
     
-    # Remove duplicates while preserving order
+    # Remove duplicates while preserving order. Tags hash by rendering their
+    # whole subtree, so compare by identity instead.
     seen = set()
     unique_matches = []
     for match in matches:
-        if match not in seen:
-            seen.add(match)
+        if id(match) not in seen:
+            seen.add(id(match))
             unique_matches.append(match)
             
     return unique_matches
@@ -550,44 +2660,60 @@ def print_element_info(element: Union[Tag, NavigableString], url: Optional[str]
     """Print detailed information about found elements, including hidden ones"""
     if element is None:
         return
+    print_match(MatchRecord(url, element, get_inherited_hidden_reason(element)))
+
+def print_match(match: Union[MatchRecord, MatchSummary]) -> None:
+    """Print a match using the visibility recorded when the page was searched"""
+    if isinstance(match, MatchRecord):
+        match = MatchSummary.from_record(match)
+    if match.url:
+        logger.info(f"Found on page: {match.url}")
     
-    if url:
-        logger.info(f"Found on page: {url}")
-    
-    if isinstance(element, NavigableString):
+    if match.tag is None:
         logger.info("Text content:")
-        logger.info(f"  {element.strip()}")
-        logger.info(f"Parent element: {element.parent.name}")
-        logger.info(
-            f"Visibility: {'Hidden' if is_hidden(element.parent) else 'Visible'}"
-        )
+        logger.info(f"  {match.snippet}")
+        if match.parent:
+            logger.info(f"Parent element: {match.parent}")
+        if match.hidden_reason:
+            logger.info(f"Visibility: Hidden ({match.hidden_reason})")
+        else:
+            logger.info("Visibility: Visible")
         return
     
     logger.info("Element details:")
-    logger.info(f"Tag: {element.name}")
+    logger.info(f"Tag: {match.tag}")
     
     # Print attributes
-    if element.attrs:
+    if match.attrs:
         logger.info("Attributes:")
-        for key, value in element.attrs.items():
+        for key, value in match.attrs.items():
             logger.info(f"  {key}: {value}")
     
     # Print content
-    if element.string:
-        logger.info(f"Content: {element.string.strip()}")
-    elif element.text:
-        logger.info(f"Content: {element.text.strip()}")
+    if match.snippet:
+        logger.info(f"Content: {match.snippet}")
     
-    # Check if element is hidden
-    if is_hidden(element):
+    if match.hidden_reason:
         logger.info("Status: Hidden element")
-        logger.info("Hidden by: %s", get_hidden_reason(element))
+        logger.info("Hidden by: %s", match.hidden_reason)
     else:
         logger.info("Status: Visible element")
 
-def export_results_to_file(results: Dict[str, List[Tuple[str, Any]]], search_values: List[str]) -> None:
+def export_results_to_file(
+    results: Dict[str, List[MatchRecord]],
+    search_values: List[str],
+    filename: Optional[str] = None,
+    index: Optional[ResultIndex] = None,
+) -> None:
+    """Write a text report of the unique matches for each search value.
+
+    Pass the crawler's ``result_index`` to reuse it; otherwise one is built
+    from ``results``.
+    """
+    if index is None:
+        index = ResultIndex.from_results(results, search_values)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"search_results_{timestamp}.txt"
+    filename = filename or f"search_results_{timestamp}.txt"
     
     try:
         with open(filename, 'w', encoding='utf-8') as f:
@@ -597,55 +2723,37 @@ def export_results_to_file(results: Dict[str, List[Tuple[str, Any]]], search_val
             
             for search_value in search_values:
                 f.write(f"\nResults for '{search_value}':\n")
-                value_results = []
-                
-                for search_type in ['text', 'id', 'class', 'attr']:
-                    key = f"{search_type}:{search_value}"
-                    if key in results:
-                        value_results.extend(results[key])
-                
-                unique_results = []
-                seen = set()
-                for url, element in value_results:
-                    if isinstance(element, NavigableString):
-                        content = element.strip()
-                    else:
-                        content = element.get_text().strip()
-                    result_id = f"{url}|{content}"
-                    
-                    if result_id not in seen:
-                        seen.add(result_id)
-                        unique_results.append((url, element))
+                unique_results = index.matches(search_value)
                 
                 if unique_results:
                     f.write(f"Found {len(unique_results)} unique occurrence(s):\n")
-                    for url, element in unique_results:
-                        f.write(f"\nFound on page: {url}\n")
-                        if isinstance(element, NavigableString):
-                            f.write(f"Text content: {element.strip()}\n")
+                    for match in unique_results:
+                        f.write(f"\nFound on page: {match.url}\n")
+                        if match.hidden_reason:
+                            f.write(f"Visibility: Hidden ({match.hidden_reason})\n")
+                        if match.tag is None:
+                            f.write(f"Text content: {match.snippet}\n")
                         else:
-                            f.write(f"Tag: {element.name}\n")
-                            if element.attrs:
+                            f.write(f"Tag: {match.tag}\n")
+                            if match.attrs:
                                 f.write("Attributes:\n")
-                                for key, value in element.attrs.items():
+                                for key, value in match.attrs.items():
                                     f.write(f"  {key}: {value}\n")
-                            if element.string:
-                                f.write(f"Text content: {element.string.strip()}\n")
-                            elif element.text:
-                                f.write(f"Text content: {element.text.strip()}\n")
+                            if match.snippet:
+                                f.write(f"Text content: {match.snippet}\n")
                 else:
                     f.write("No elements found\n")
                     f.write("Note: The element might be:\n")
                     f.write("1. Not present on any crawled page\n")
                     f.write("2. On pages not yet crawled\n")
-                    f.write("3. Dynamically loaded by JavaScript\n")
+                    f.write("3. Dynamically loaded by JavaScript (try --scan-assets)\n")
                     f.write("4. In a different format or have different attributes\n")
         
         logger.info(f"Results exported to: {filename}")
     except Exception as e:
         logger.error(f"Error exporting results: {e}")
 
-def get_user_input() -> CrawlerConfig:
+def get_user_input(base_url: Optional[str] = None) -> CrawlerConfig:
     logger.info("=== Where's My Value Configuration ===")
     
     def get_valid_input(prompt: str, validator: Callable[[str], bool], default: Any = None) -> Any:
@@ -666,7 +2774,7 @@ def get_user_input() -> CrawlerConfig:
         except:
             return False
     
-    url = get_valid_input(
+    url = base_url or get_valid_input(
         "Enter the website URL to crawl (e.g., https://example.com): ",
         validate_url
     )
@@ -754,45 +2862,213 @@ def get_user_input() -> CrawlerConfig:
     )
 
 
-def run_crawl(config: CrawlerConfig) -> Dict[str, List[Dict[str, str]]]:
+def serialize_results(raw_results: Dict[str, List[MatchRecord]]) -> Dict[str, List[Dict[str, Optional[str]]]]:
+    """Convert raw crawl results into JSON serializable dictionaries.
+
+    ``text`` is the element's :func:`element_snippet`, so a match on a large
+    element such as ``<body>`` doesn't walk its whole subtree. ``hidden``
+    holds the reason a match is hidden, or ``None`` if visible.
+    """
+    return {
+        key: [
+            {
+                "url": record.url,
+                "text": element_snippet(record.element),
+                "hidden": record.hidden_reason,
+            }
+            for record in items
+        ]
+        for key, items in raw_results.items()
+    }
+
+def run_crawl(config: CrawlerConfig) -> Dict[str, List[Dict[str, Optional[str]]]]:
     """Run the crawler and return JSON serializable results."""
-    crawler = WebCrawler(config)
+    crawler = WebCrawler(config, index_results=False)
+    raw_results = crawler.crawl_and_search(build_searches(config.search_values))
+    return serialize_results(raw_results)
 
-    searches: List[Tuple[str, str]] = []
-    for value in config.search_values:
-        searches.extend([
-            ("text", value),
-            ("id", value),
-            ("class", value),
-            ("attr", value),
-        ])
-
-    raw_results = crawler.crawl_and_search(searches)
-
-    serialized: Dict[str, List[Dict[str, str]]] = {}
-    for key, items in raw_results.items():
-        serialized[key] = []
-        for url, element in items:
-            if isinstance(element, NavigableString):
-                text = str(element).strip()
-            else:
-                text = element.get_text(strip=True)
-            serialized[key].append({"url": url, "text": text})
-    return serialized
+def run_crawl_chunk(
+    config: CrawlerConfig, time_budget: float, continuation: Optional[str] = None
+) -> Dict[str, Any]:
+    """Crawl for at most ``time_budget`` seconds, continuing from a token.
 
-def main() -> None:
-    config = get_user_input()
-    crawler = WebCrawler(config)
-    
-    searches = []
-    for search_value in config.search_values:
-        searches.extend([
-            ('text', search_value),
-            ('id', search_value),
-            ('class', search_value),
-            ('attr', search_value)
-        ])
-    
+    Returns the matches found in this chunk, the crawl totals and a
+    ``continuation`` token to pass to the next call, which is ``None`` once
+    the crawl is complete. Raises ``ValueError`` for an invalid token.
+    """
+    deadline = time.monotonic() + time_budget
+    crawler = WebCrawler(config, index_results=False)
+    if continuation:
+        crawler.resume_from(continuation)
+    raw_results = crawler.crawl_and_search(
+        build_searches(config.search_values), deadline=deadline
+    )
+    return {
+        "results": serialize_results(raw_results),
+        "continuation": crawler.continuation_token() if crawler.budget_exhausted else None,
+        "found_values": sorted(crawler.found_values),
+        "pages_visited": crawler.stats.pages_visited,
+        "errors": crawler.stats.error_count,
+    }
+
+def run_batch_crawl(
+    configs: List[CrawlerConfig], max_workers: Optional[int] = None
+) -> Dict[str, Dict[str, List[Dict[str, Optional[str]]]]]:
+    """Crawl several sites over a shared worker pool.
+
+    Returns JSON serializable results keyed by each site's base URL. The
+    searches are built once from the first config and shared by every site.
+    """
+    unique_configs = list({config.base_url: config for config in configs}.values())
+    batch = BatchCrawler(unique_configs, max_workers=max_workers, index_results=False)
+    raw_results = batch.crawl_and_search(build_searches(unique_configs[0].search_values))
+    return {
+        base_url: serialize_results(site_results)
+        for base_url, site_results in raw_results.items()
+    }
+
+def run_frontier_worker(
+    store_path: str,
+    worker_id: Optional[str] = None,
+    batch_size: int = 5,
+    poll_interval: float = 1.0,
+) -> int:
+    """Crawl URLs leased from a shared :class:`FrontierStore` until it is drained.
+
+    The crawl configuration is read from the store, so any number of workers
+    on any machine that can open the store file can join the same crawl.
+    Returns the number of pages this worker completed.
+    """
+    import socket
+
+    from frontier_store import FrontierStore
+
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    store = FrontierStore(store_path)
+    config = CrawlerConfig(**store.load_config())
+    crawler = WebCrawler(config, index_results=False)
+    searches = build_searches(config.search_values)
+    completed = 0
+
+    try:
+        while not crawler._stop_requested:
+            leased = store.lease(worker_id, batch_size, config.max_pages)
+            if not leased:
+                if store.is_finished(config.max_pages):
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            for url, depth in leased:
+                logger.info(f"[{worker_id}] Processing: {url}")
+                try:
+                    page = crawler.crawl_page(url, depth, searches)
+                except Exception as e:
+                    # Transient failure or paused host: let a worker try again later
+                    delay = crawler.retry_delay(url, e)
+                    if delay is None:
+                        store.fail(worker_id, url)
+                    else:
+                        store.release(worker_id, url, delay)
+                    continue
+                if page is None:
+                    store.fail(worker_id, url)
+                    continue
+
+                matches = {} if page.duplicate_of else serialize_results(page.matches)
+                found = [
+                    found_value_for(search_type, value) for search_type, value in searches
+                    if found_value_for(search_type, value)
+                    and any(page.matches.get(key) for key in crawler.result_keys(search_type, value))
+                ]
+                if store.complete(worker_id, page.url, matches, page.links, found):
+                    completed += 1
+                time.sleep(config.sleep_time)
+    except KeyboardInterrupt:
+        logger.info(f"[{worker_id}] Interrupted. Leased URLs will be handed out again.")
+    finally:
+        crawler.close()
+        store.close()
+
+    logger.info(f"[{worker_id}] Finished after {completed} pages")
+    return completed
+
+def run_distributed_crawl(
+    config: CrawlerConfig, store_path: str, num_workers: int
+) -> Dict[str, List[Dict[str, Optional[str]]]]:
+    """Coordinate a crawl over ``num_workers`` local worker processes.
+
+    The frontier, dedupe set and matches live in ``store_path``; rerunning
+    with the same store resumes an interrupted crawl. Returns results in the
+    same format as :func:`run_crawl`.
+    """
+    import multiprocessing
+    import socket
+
+    from frontier_store import FrontierStore
+
+    store = FrontierStore(store_path)
+    store.save_config(asdict(config))
+    store.add_urls([(config.base_url, 0)])
+
+    processes = [
+        multiprocessing.Process(
+            target=run_frontier_worker,
+            args=(store_path, f"{socket.gethostname()}-worker-{index}"),
+        )
+        for index in range(num_workers)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        logger.info("Ctrl+C detected. Waiting for workers to stop...")
+        for process in processes:
+            process.join()
+
+    searches = build_searches(config.search_values)
+    results = store.results(f"{search_type}:{value}" for search_type, value in searches)
+    logger.info(f"Distributed crawl finished: {store.pages_done()} pages")
+    store.close()
+    return results
+
+def report_results(
+    results: Dict[str, List[MatchRecord]],
+    search_values: List[str],
+    index: Optional[ResultIndex] = None,
+) -> None:
+    """Log the unique matches found for each search value"""
+    if index is None:
+        index = ResultIndex.from_results(results, search_values)
+
+    logger.info("=== Search Results ===")
+    for search_value in search_values:
+        logger.info(f"Results for '{search_value}':")
+        unique_results = index.matches(search_value)
+
+        if unique_results:
+            logger.info(f"Found {len(unique_results)} unique occurrence(s):")
+            for match in unique_results:
+                print_match(match)
+        else:
+            logger.info("No elements found")
+            logger.info("Note: The element might be:")
+            logger.info("1. Not present on any crawled page")
+            logger.info("2. On pages not yet crawled")
+            logger.info("3. Dynamically loaded by JavaScript (try --scan-assets)")
+            logger.info("4. In a different format or have different attributes")
+
+def read_url_list(path: str) -> List[str]:
+    """Read base URLs from a file, one per line. Blank lines and ``#`` comments are ignored."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [
+            line.strip() for line in f
+            if line.strip() and not line.strip().startswith('#')
+        ]
+
+def log_config(config: CrawlerConfig) -> None:
     logger.info("=== Crawler Configuration ===")
     logger.info(f"URL: {config.base_url}")
     logger.info(f"Searching for: {', '.join(config.search_values)}")
@@ -801,7 +3077,7 @@ def main() -> None:
     logger.info(f"Delay between requests: {config.sleep_time} seconds")
     logger.info(f"Request timeout: {config.timeout} seconds")
     logger.info(f"Maximum crawl depth: {config.max_depth}")
-    
+
     if config.respect_robots:
         logger.info("Respecting robots.txt")
     if config.use_history:
@@ -810,49 +3086,147 @@ def main() -> None:
         logger.info("Debug mode enabled")
     if config.export_results:
         logger.info("Results will be exported to file")
-    
+
+def run_batch_main(url_file: str, overrides: Optional[Dict[str, Any]] = None) -> None:
+    """Interactive batch mode: crawl every URL listed in ``url_file``"""
+    urls = read_url_list(url_file)
+    if not urls:
+        logger.error(f"No URLs found in {url_file}")
+        return
+
+    config = replace(get_user_input(base_url=urls[0]), **(overrides or {}))
+    configs = []
+    for url in urls:
+        history_file = config.history_file
+        if history_file:
+            # Keep one history file per site so the sites don't overwrite each other
+            root, ext = os.path.splitext(history_file)
+            history_file = f"{root}_{urlparse(url).netloc}{ext}"
+        configs.append(replace(config, base_url=url, history_file=history_file))
+
+    log_config(config)
+    logger.info(f"Batch mode: {len(configs)} sites")
+    logger.info("Press Ctrl+C to stop at any time")
+
+    batch = BatchCrawler(configs)
+    results = batch.crawl_and_search(build_searches(config.search_values))
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    for crawler in batch.crawlers:
+        base_url = crawler.config.base_url
+        logger.info(f"=== Site: {base_url} ({crawler.stats.pages_visited} pages) ===")
+        report_results(results.get(base_url, {}), config.search_values, crawler.result_index)
+        if config.export_results:
+            export_results_to_file(
+                results.get(base_url, {}),
+                config.search_values,
+                filename=f"search_results_{crawler.base_domain}_{timestamp}.txt",
+                index=crawler.result_index,
+            )
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Locate values across a website.")
+    parser.add_argument(
+        '--batch',
+        metavar='FILE',
+        help="Crawl every base URL listed in FILE (one per line) over a shared worker pool",
+    )
+    parser.add_argument(
+        '--store',
+        metavar='DB',
+        help="Coordinate a distributed crawl through the SQLite frontier store DB",
+    )
+    parser.add_argument(
+        '--processes',
+        type=int,
+        default=4,
+        help="Number of local worker processes started with --store (default: 4)",
+    )
+    parser.add_argument(
+        '--join',
+        metavar='DB',
+        help="Run a worker for the crawl coordinated through the store DB",
+    )
+    parser.add_argument(
+        '--cache-dir',
+        metavar='DIR',
+        help="Cache responses in DIR and reuse them on later runs while they are fresh",
+    )
+    parser.add_argument(
+        '--include',
+        metavar='RULE',
+        action='append',
+        default=[],
+        help="Only crawl URLs matching RULE: a path prefix, glob:PATTERN or regex:PATTERN (repeatable)",
+    )
+    parser.add_argument(
+        '--exclude',
+        metavar='RULE',
+        action='append',
+        default=[],
+        help="Skip URLs matching RULE, in the same format as --include (repeatable)",
+    )
+    parser.add_argument(
+        '--scan-assets',
+        action='store_true',
+        help="Also search same-origin scripts and JSON referenced by crawled pages",
+    )
+    return parser.parse_args(argv)
+
+def run_distributed_main(
+    store_path: str, num_workers: int, overrides: Optional[Dict[str, Any]] = None
+) -> None:
+    """Interactive coordinator mode for a crawl shared by several processes"""
+    config = replace(get_user_input(), **(overrides or {}))
+    log_config(config)
+    logger.info(f"Distributed mode: {num_workers} worker processes, store {store_path}")
+
+    results = run_distributed_crawl(config, store_path, num_workers)
+    logger.info("=== Search Results ===")
+    for key, items in results.items():
+        if items:
+            logger.info(f"{key}: {len(items)} match(es)")
+            for item in items:
+                logger.info(f"  {item['url']}: {item['text'][:200]}")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
+    args = parse_args(argv)
+    # Settings given on the command line rather than at the prompts
+    overrides = dict(
+        cache_dir=args.cache_dir,
+        include_rules=args.include,
+        exclude_rules=args.exclude,
+        scan_assets=args.scan_assets,
+    )
+    if args.batch:
+        run_batch_main(args.batch, overrides)
+        return
+    if args.join:
+        run_frontier_worker(args.join)
+        return
+    if args.store:
+        run_distributed_main(args.store, args.processes, overrides)
+        return
+
+    config = replace(get_user_input(), **overrides)
+    crawler = WebCrawler(config)
+    searches = build_searches(config.search_values)
+
+    log_config(config)
     logger.info("Press Ctrl+C to stop at any time")
     
     try:
         results = crawler.crawl_and_search(searches)
-        
-        logger.info("=== Search Results ===")
-        for search_value in config.search_values:
-            logger.info(f"Results for '{search_value}':")
-            value_results = []
-            
-            for search_type in ['text', 'id', 'class', 'attr']:
-                key = f"{search_type}:{search_value}"
-                if key in results:
-                    value_results.extend(results[key])
-            
-            unique_results = []
-            seen = set()
-            for url, element in value_results:
-                if isinstance(element, NavigableString):
-                    content = element.strip()
-                else:
-                    content = element.get_text().strip()
-                result_id = f"{url}|{content}"
-                
-                if result_id not in seen:
-                    seen.add(result_id)
-                    unique_results.append((url, element))
-            
-            if unique_results:
-                logger.info(f"Found {len(unique_results)} unique occurrence(s):")
-                for url, element in unique_results:
-                    print_element_info(element, url)
-            else:
-                logger.info("No elements found")
-                logger.info("Note: The element might be:")
-                logger.info("1. Not present on any crawled page")
-                logger.info("2. On pages not yet crawled")
-                logger.info("3. Dynamically loaded by JavaScript")
-                logger.info("4. In a different format or have different attributes")
+        report_results(results, config.search_values, crawler.result_index)
         
         if config.export_results:
-            export_results_to_file(results, config.search_values)
+            export_results_to_file(results, config.search_values, index=crawler.result_index)
             
     except KeyboardInterrupt:
         logger.info("Crawl interrupted by user. Stopping...")